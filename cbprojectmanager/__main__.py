@@ -0,0 +1,463 @@
+"""Command line interface of the project manager
+
+The interface does not import Qt, the database library is imported by the
+command which needs it. Use --json for output suitable for scripts.
+
+Errors like an unknown project or an unreachable database are written to
+stderr without a traceback and exit with code 1, with --json an object with
+the `error` is printed as well.
+
+Example:
+    $ python -m cbprojectmanager list --json
+    $ python -m cbprojectmanager show MyProject
+    $ python -m cbprojectmanager create ShotA ShotB --from MyProject
+    $ python -m cbprojectmanager clone MyProject MyProjectCopy
+    $ python -m cbprojectmanager stats --json
+    $ python -m cbprojectmanager export MyProject --output MyProject.jsonl
+    $ python -m cbprojectmanager export MyProject --archive MyProject.zip
+    $ python -m cbprojectmanager import MyProject.zip --name MyProjectCopy
+    $ python -m cbprojectmanager create-projects season.json --workers 8
+    $ python -m cbprojectmanager import-assets MyProject assets.csv
+    $ python -m cbprojectmanager validate --report failures.jsonl
+
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+
+def load_manifest(path):
+    """Load a JSON or YAML manifest with project specs
+
+    The manifest is either a list of specs or a dictionary with the specs
+    under `projects`, see `lib.create_projects` for the spec layout.
+
+    Args:
+        path(str): path to a .json, .yaml or .yml file
+
+    Returns:
+        list
+
+    """
+
+    with open(path, "r") as f:
+        if os.path.splitext(path)[-1].lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("PyYAML is required to read `%s`" % path)
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+
+    if isinstance(manifest, dict):
+        manifest = manifest.get("projects", [])
+
+    if not isinstance(manifest, list):
+        raise ValueError("Manifest `%s` does not contain a list of "
+                         "projects" % path)
+
+    return manifest
+
+
+def _print_json(data):
+    """Print data as JSON, ObjectIds and dates are written as extended JSON"""
+
+    from bson import json_util
+
+    print(json_util.dumps(data, indent=4, sort_keys=True))
+
+
+def _print_reports(reports):
+    for report in reports:
+        state = "OK" if report["success"] else "FAILED"
+        line = "%-7s %s (%.3f s)" % (state,
+                                     report["name"],
+                                     report["duration"])
+        if report["error"]:
+            line += ": %s" % report["error"]
+        print(line)
+
+
+def _errors():
+    """Return the exceptions which are reported without a traceback
+
+    The modules are imported when an exception is raised, not on start up.
+
+    """
+
+    from pymongo.errors import PyMongoError
+    from cbprojectmanager.archive import ArchiveError
+
+    return (ValueError, RuntimeError, EnvironmentError, PyMongoError,
+            ArchiveError)
+
+
+def list_projects(args):
+    from cbprojectmanager import lib
+
+    lib.install()
+
+    projection = None if args.full else ["name", "data"]
+    projects = sorted(lib.get_projects(projection=projection),
+                      key=lambda p: p["name"])
+
+    if args.json:
+        _print_json(projects)
+    else:
+        for project in projects:
+            print(project["name"])
+
+    return 0
+
+
+def show_project(args):
+    from cbprojectmanager import lib
+
+    lib.install()
+
+    project = lib.get_project(args.project)
+    if project is None:
+        sys.stderr.write("Could not find project `%s`\n" % args.project)
+        return 1
+
+    _print_json(project)
+
+    return 0
+
+
+def create(args):
+    from cbprojectmanager import lib
+
+    template = None
+    if args.from_project:
+        template = args.from_project
+    elif args.template:
+        template = lib.get_template(args.template)
+
+    lib.install()
+    reports = lib.create_projects([{"name": name, "template": template}
+                                   for name in args.names],
+                                  max_workers=args.workers)
+
+    if args.json:
+        print(json.dumps(reports, indent=4))
+    else:
+        _print_reports(reports)
+
+    failed = [r for r in reports if not r["success"]]
+    return 1 if failed else 0
+
+
+def clone(args):
+    from cbprojectmanager import lib
+
+    lib.install()
+    report = lib.clone_project(args.source,
+                               args.name,
+                               batch_size=args.batch_size)
+
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print("Copied %(documents)i documents in %(duration).3f s "
+              "(%(rate).0f documents/s)" % report)
+
+    return 0
+
+
+def stats(args):
+    from cbprojectmanager import lib
+
+    lib.install()
+    statistics = lib.get_statistics(args.projects or None,
+                                    max_workers=args.workers)
+
+    if args.json:
+        print(json.dumps(statistics, indent=4, sort_keys=True))
+    else:
+        for name in sorted(statistics):
+            statistic = statistics[name]
+            print("%s: %i documents, %i assets, %i silos" % (
+                name,
+                sum(statistic["documents"].values()),
+                statistic["assets"],
+                len(statistic["silos"])))
+
+    return 0
+
+
+def export(args):
+    """Write all documents of a project as JSON lines or to an archive"""
+
+    from bson import json_util
+    from cbprojectmanager import lib
+
+    lib.install()
+
+    if args.archive:
+        from cbprojectmanager import archive
+
+        manifest = archive.export_project(args.project,
+                                          args.archive,
+                                          level=args.level,
+                                          max_workers=args.workers)
+        sys.stderr.write("Exported %(documents)i documents in "
+                         "%(duration).3f s (%(rate).0f documents/s)\n"
+                         % manifest)
+        return 0
+
+    collection = lib.get_collection(args.project)
+
+    output = open(args.output, "w") if args.output else sys.stdout
+
+    t1 = time.time()
+    count = 0
+    try:
+        for document in collection.find({}, batch_size=args.batch_size):
+            output.write(json_util.dumps(document) + "\n")
+            count += 1
+    finally:
+        if args.output:
+            output.close()
+
+    duration = time.time() - t1
+    sys.stderr.write("Exported %i documents in %.3f s (%.0f documents/s)\n"
+                     % (count, duration, count / max(duration, 1e-6)))
+
+    return 0
+
+
+def import_project(args):
+    from cbprojectmanager import lib, archive
+
+    lib.install()
+    report = archive.import_project(args.archive,
+                                    name=args.name,
+                                    batch_size=args.batch_size,
+                                    verify=not args.no_verify)
+
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print("Imported %(documents)i documents in %(duration).3f s "
+              "(%(rate).0f documents/s)" % report)
+
+    return 0
+
+
+def create_projects(args):
+    from cbprojectmanager import lib
+
+    specs = load_manifest(args.manifest)
+
+    lib.install()
+    reports = lib.create_projects(specs, max_workers=args.workers)
+
+    if args.json:
+        print(json.dumps(reports, indent=4))
+    else:
+        _print_reports(reports)
+
+    failed = [r for r in reports if not r["success"]]
+    return 1 if failed else 0
+
+
+def import_assets(args):
+    from cbprojectmanager import lib
+
+    lib.install()
+    report = lib.import_assets(args.project,
+                               args.path,
+                               chunk_size=args.chunk_size)
+
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print("Read %(read)i, inserted %(inserted)i, invalid %(invalid)i, "
+              "failed %(failed)i in %(duration).3f s "
+              "(%(rate).0f documents/s)" % report)
+        for error in report["errors"]:
+            print("  %s" % error)
+
+    return 1 if report["invalid"] or report["failed"] else 0
+
+
+def validate(args):
+    from cbprojectmanager import lib, validation
+
+    def progress(summary):
+        sys.stderr.write("%(documents)i documents, %(failed)i failed "
+                         "(%(rate).0f documents/s)\n" % summary)
+
+    lib.install()
+    summary = validation.validate_projects(args.projects or None,
+                                           report=args.report,
+                                           processes=args.processes,
+                                           batch_size=args.batch_size,
+                                           progress=progress)
+
+    if args.json:
+        print(json.dumps(summary, indent=4))
+    else:
+        print("Validated %(documents)i documents of %(projects)i projects, "
+              "%(failed)i failed in %(duration).3f s "
+              "(%(rate).0f documents/s)" % summary)
+
+    return 1 if summary["failed"] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cbprojectmanager")
+    parser.add_argument("--mongo",
+                        help="Url of the database, overrides AVALON_MONGO")
+    parser.add_argument("--database",
+                        help="Name of the database, overrides AVALON_DB")
+
+    subparsers = parser.add_subparsers(dest="command")
+
+    list_parser = subparsers.add_parser("list", help="List the projects")
+    list_parser.add_argument("--full", action="store_true",
+                             help="Include the whole project documents")
+    list_parser.add_argument("--json", action="store_true",
+                             help="Print the projects as JSON")
+    list_parser.set_defaults(func=list_projects)
+
+    show_parser = subparsers.add_parser(
+        "show", help="Print a project document as JSON")
+    show_parser.add_argument("project", help="Name of the project")
+    show_parser.set_defaults(func=show_project)
+
+    new_parser = subparsers.add_parser("create", help="Create projects")
+    new_parser.add_argument("names", nargs="+",
+                            help="Names of the new projects")
+    template_group = new_parser.add_mutually_exclusive_group()
+    template_group.add_argument("--template",
+                                help="Name of the template to use")
+    template_group.add_argument("--from", dest="from_project",
+                                help="Use the settings of this project")
+    new_parser.add_argument("--workers", type=int, default=4,
+                            help="Amount of projects created at once")
+    new_parser.add_argument("--json", action="store_true",
+                            help="Print the report as JSON")
+    new_parser.set_defaults(func=create)
+
+    clone_parser = subparsers.add_parser(
+        "clone", help="Copy a project with all its documents")
+    clone_parser.add_argument("source", help="Name of the project to copy")
+    clone_parser.add_argument("name", help="Name of the new project")
+    clone_parser.add_argument("--batch-size", type=int, default=None,
+                              help="Documents per insert")
+    clone_parser.add_argument("--json", action="store_true",
+                              help="Print the report as JSON")
+    clone_parser.set_defaults(func=clone)
+
+    stats_parser = subparsers.add_parser(
+        "stats", help="Document counts of projects")
+    stats_parser.add_argument("projects", nargs="*",
+                              help="Names of the projects, all projects "
+                                   "when not given")
+    stats_parser.add_argument("--workers", type=int, default=8,
+                              help="Amount of projects processed at once")
+    stats_parser.add_argument("--json", action="store_true",
+                              help="Print the statistics as JSON")
+    stats_parser.set_defaults(func=stats)
+
+    export_parser = subparsers.add_parser(
+        "export", help="Write the documents of a project as JSON lines")
+    export_parser.add_argument("project", help="Name of the project")
+    export_parser.add_argument("--output",
+                               help="Path of the file, printed when not "
+                                    "given")
+    export_parser.add_argument("--batch-size", type=int, default=1000,
+                               help="Documents per round trip")
+    export_parser.add_argument("--archive",
+                               help="Write a compressed archive to this "
+                                    "path in stead of JSON lines")
+    export_parser.add_argument("--level", type=int, default=None,
+                               help="Compression level of the archive, "
+                                    "1 to 9")
+    export_parser.add_argument("--workers", type=int, default=None,
+                               help="Threads compressing the archive, "
+                                    "defaults to the amount of cores")
+    export_parser.set_defaults(func=export)
+
+    restore_parser = subparsers.add_parser(
+        "import", help="Restore a project from an archive")
+    restore_parser.add_argument("archive", help="Path of the archive")
+    restore_parser.add_argument("--name",
+                                help="Name of the project, defaults to the "
+                                     "name in the archive")
+    restore_parser.add_argument("--batch-size", type=int, default=None,
+                                help="Documents per insert")
+    restore_parser.add_argument("--no-verify", action="store_true",
+                                help="Do not compare the checksums")
+    restore_parser.add_argument("--json", action="store_true",
+                                help="Print the report as JSON")
+    restore_parser.set_defaults(func=import_project)
+
+    create_parser = subparsers.add_parser(
+        "create-projects",
+        help="Create the projects listed in a JSON or YAML manifest")
+    create_parser.add_argument("manifest", help="Path to the manifest")
+    create_parser.add_argument("--workers", type=int, default=4,
+                               help="Amount of projects created at once")
+    create_parser.add_argument("--json", action="store_true",
+                               help="Print the report as JSON")
+    create_parser.set_defaults(func=create_projects)
+
+    import_parser = subparsers.add_parser(
+        "import-assets",
+        help="Import assets from a CSV or JSON lines file")
+    import_parser.add_argument("project", help="Name of the project")
+    import_parser.add_argument("path", help="Path to the .csv or .jsonl file")
+    import_parser.add_argument("--chunk-size", type=int, default=None,
+                               help="Documents per insert")
+    import_parser.add_argument("--json", action="store_true",
+                               help="Print the report as JSON")
+    import_parser.set_defaults(func=import_assets)
+
+    validate_parser = subparsers.add_parser(
+        "validate",
+        help="Validate the documents of projects against the avalon schemas")
+    validate_parser.add_argument("projects", nargs="*",
+                                 help="Names of the projects, all projects "
+                                      "when not given")
+    validate_parser.add_argument("--report",
+                                 help="Write the failures as JSON lines to "
+                                      "this file")
+    validate_parser.add_argument("--processes", type=int, default=None,
+                                 help="Amount of processes, defaults to the "
+                                      "amount of cores")
+    validate_parser.add_argument("--batch-size", type=int, default=None,
+                                 help="Documents per batch")
+    validate_parser.add_argument("--json", action="store_true",
+                                 help="Print the summary as JSON")
+    validate_parser.set_defaults(func=validate)
+
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.print_help()
+        return 1
+
+    from avalon import api
+
+    if args.mongo:
+        api.Session["AVALON_MONGO"] = args.mongo
+    if args.database:
+        api.Session["AVALON_DB"] = args.database
+
+    try:
+        return args.func(args)
+    except _errors() as exception:
+        sys.stderr.write("%s\n" % exception)
+        if getattr(args, "json", False):
+            print(json.dumps({"error": str(exception)}, indent=4))
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
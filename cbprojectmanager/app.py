@@ -6,23 +6,32 @@
 * http://www.digitalmediaworld.tv/images/stories/July-16/3/Ftrack-cinema4d-06-ftrack.jpg
 """
 
+import os
 import sys
 
 import logging
+from functools import partial
 
-from avalon.vendor.Qt import QtWidgets, QtCore
-from avalon.vendor import qtawesome as qta
-from avalon import api, style
+from avalon.vendor.Qt import QtWidgets, QtGui, QtCore
+from avalon import style
 
 from cbprojectmanager.widgets import (
     CreateProjectWidget,
     ManageProjectWidget,
     OverviewWidget,
-    Navigation
+    Navigation,
+    DebugPanel
 )
 
-from cbprojectmanager import lib
 from cbprojectmanager import style as cbstyle
+from cbprojectmanager.projectmodel import ProjectModel, ProjectFilterModel
+from cbprojectmanager.worker import get_executor
+
+# Event types of cbprojectmanager.watcher, the module itself is imported
+# when the watcher is started
+ADDED = "added"
+REMOVED = "removed"
+UPDATED = "updated"
 
 module = sys.modules[__name__]
 module.window = None
@@ -31,11 +40,26 @@ module.window = None
 class Window(QtWidgets.QWidget):
 
     project_changed = QtCore.Signal(str)
+    project_event = QtCore.Signal(str, str, object)
     log = logging.getLogger("Project Manager")
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, watch=False, debug=None):
         QtWidgets.QWidget.__init__(self, parent)
 
+        if os.environ.get("CBPROJECTMANAGER_PROFILE"):
+            # Before the signals are connected, they use the timed slots
+            from cbprojectmanager import profiler
+            profiler.enable(os.environ["CBPROJECTMANAGER_PROFILE"])
+
+        if debug is None:
+            debug = bool(os.environ.get("CBPROJECTMANAGER_INSTRUMENT"))
+
+        if debug:
+            # Before the database is installed, else the commands of the
+            # client are not recorded
+            from cbprojectmanager import instrument
+            instrument.enable()
+
         self.setWindowTitle("Project Manager")
         self.resize(1200, 800)
 
@@ -56,32 +80,43 @@ class Window(QtWidgets.QWidget):
 
         # Main buttons - create
         create_button = QtWidgets.QPushButton()
-        create_icon = qta.icon("fa.plus-square", color=style.colors.light)
 
         create_button.setIconSize(icon_size)
 
         create_button.setFixedWidth(ctrl_button_w)
         create_button.setFixedHeight(ctrl_button_h)
 
-        create_button.setIcon(create_icon)
         create_button.setStyleSheet(cbstyle.flat_button)
 
         # Main buttons - refresh
         refresh_button = QtWidgets.QPushButton()
-        refresh_icon = qta.icon("fa.refresh", color=style.colors.light)
 
         refresh_button.setIconSize(icon_size)
 
         refresh_button.setFixedWidth(ctrl_button_w)
         refresh_button.setFixedHeight(ctrl_button_h)
 
-        refresh_button.setIcon(refresh_icon)
         refresh_button.setStyleSheet(cbstyle.flat_button)
 
         # Project switch control
         projects_label = QtWidgets.QLabel("Project:")
+        project_model = ProjectModel()
+
         projects = QtWidgets.QComboBox()
-        projects.insertItem(0, "<None>")
+        projects.setModel(project_model)
+
+        # Type-ahead search, the filter is updated while typing
+        project_filter = ProjectFilterModel()
+        project_filter.setSourceModel(project_model)
+
+        completer = QtWidgets.QCompleter(project_filter, projects)
+        completer.setCaseSensitivity(QtCore.Qt.CaseInsensitive)
+        completer.setCompletionMode(
+            QtWidgets.QCompleter.UnfilteredPopupCompletion)
+
+        projects.setEditable(True)
+        projects.setInsertPolicy(QtWidgets.QComboBox.NoInsert)
+        projects.setCompleter(completer)
 
         # Add buttons to the main control layout
         main_control_layout.addWidget(create_button)
@@ -130,16 +165,56 @@ class Window(QtWidgets.QWidget):
         self._database_label = database_label
         self._create_button = create_button
         self._projects = projects
+        self._project_model = project_model
+        self._project_filter = project_filter
         self._refresh_button = refresh_button
 
         self._overview = overview
 
+        self._watcher = None
+        self._watch = watch
+
+        # Database call metrics, toggled with F12
+        self._debug_panel = None
+        if debug:
+            self._debug_panel = DebugPanel(parent=self)
+            shortcut = QtWidgets.QShortcut(QtGui.QKeySequence("F12"), self)
+            shortcut.activated.connect(self.toggle_debug_panel)
+
         self.connect_signals()
 
-        self.refresh()
+        # Show the window first, the icons and the database connection are
+        # loaded once the event loop runs
+        self.set_loading(True)
+        QtCore.QTimer.singleShot(0, self._load_icons)
+        QtCore.QTimer.singleShot(0, self.refresh)
 
         manager_widget.setFocus(True)
 
+    def _load_icons(self):
+        from avalon.vendor import qtawesome as qta
+
+        self._create_button.setIcon(
+            qta.icon("fa.plus-square", color=style.colors.light))
+        self._refresh_button.setIcon(
+            qta.icon("fa.refresh", color=style.colors.light))
+
+    def toggle_debug_panel(self):
+        if self._debug_panel is None:
+            return
+
+        self._debug_panel.setVisible(not self._debug_panel.isVisible())
+
+    def set_loading(self, state):
+        """Disable the controls which need the database while loading"""
+
+        self._create_button.setEnabled(not state)
+        self._refresh_button.setEnabled(not state)
+        self._projects.setEnabled(not state)
+
+        if state:
+            self._database_label.setText("Database: connecting ..")
+
     def connect_signals(self):
         """Create connections between widgets"""
 
@@ -147,42 +222,104 @@ class Window(QtWidgets.QWidget):
             self._stacked_widget.setCurrentIndex)
 
         self.project_changed.connect(self.on_project_changed)
+        self.project_event.connect(self.on_project_event)
 
-        self._refresh_button.clicked.connect(self.refresh)
+        # clicked(bool) would be passed on as `select`
+        self._refresh_button.clicked.connect(lambda: self.refresh())
         self._create_button.clicked.connect(self.on_create)
         self._projects.currentIndexChanged.connect(self.on_project_index_changed)
+        self._projects.lineEdit().textEdited.connect(
+            self._project_filter.setFilterFixedString)
+
+    def refresh(self, select=None):
+        """Refresh connection to database and reload the projects
+
+        The database is queried in the background, the project dropdown
+        menu is populated once the result is in.
+
+        Args:
+            select(str, optional): name of the project to select afterwards
 
-    def refresh(self):
-        """Refresh connection to database and """
+        """
 
-        def sorter(project):
-            """Sort based on order attribute of the plugin"""
-            return project["name"]
+        self.set_loading(True)
 
-        lib.install()
-        self.set_database_label(lib.get_database_name())
+        get_executor().submit(_fetch_projects,
+                              callback=partial(self._on_refreshed, select),
+                              error=self._on_refresh_failed,
+                              key="refresh")
 
-        query = list(lib.get_projects())
-        projects = sorted(query, key=sorter)
+    def _on_refreshed(self, select, result):
+        database_name, projects = result
+
+        self.set_loading(False)
+        self.set_database_label(database_name)
 
         self.projects = {p["name"]: p["_id"] for p in projects}
 
         self.populate_projects(projects)
 
+        if select is not None:
+            self.select_project(select)
+
+        if self._watch:
+            self.start_watcher()
+
+    def _on_refresh_failed(self, exception):
+        self.set_loading(False)
+        self.set_database_label()
+        self.log.error("Could not refresh projects: %s" % exception)
+
     def set_database_label(self, name=None):
         label = "Database: {}".format(name or "<None>")
         self._database_label.setText(label)
 
     def populate_projects(self, projects):
-        """Add projects to project dropdown menu"""
+        """Update the project dropdown menu with the given projects
+
+        Only the projects which were added or removed since the last call
+        are inserted in or removed from the menu.
+        """
+
+        self._project_model.set_projects({p["name"]: p["_id"]
+                                          for p in projects})
+
+    def start_watcher(self, interval=5.0):
+        """Listen to project changes in the database
 
-        completer = QtWidgets.QCompleter([p["name"] for p in projects])
-        self._projects.setCompleter(completer)
+        Events are received on the watcher thread and delivered to
+        `on_project_event` through the `project_event` signal.
 
-        for idx, project in enumerate(projects):
-            self._projects.insertItem(idx + 1,
-                                      project["name"],
-                                      userData=project["_id"])
+        Args:
+            interval(float): seconds between polls when the database does
+                not support change streams
+
+        Returns:
+            None
+
+        """
+
+        if self._watcher is not None:
+            return
+
+        from cbprojectmanager import watcher
+
+        self._watch = True
+        self._watcher = watcher.ProjectWatcher(self.project_event.emit,
+                                               interval=interval)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        if self._watcher is None:
+            return
+
+        self._watch = False
+        self._watcher.stop()
+        self._watcher = None
+
+    def closeEvent(self, event):
+        self.stop_watcher()
+        QtWidgets.QWidget.closeEvent(self, event)
 
     def get_project(self, as_id=False):
 
@@ -190,13 +327,13 @@ class Window(QtWidgets.QWidget):
         if current_index == 0:
             return
 
-        item = self._projects.itemAt(current_index)
         if as_id:
-            _id = item.userData()
+            _id = self._projects.itemData(current_index,
+                                          ProjectModel.IdRole)
             assert _id, "This is a bug!"
             return _id
 
-        project_name = item.text()
+        project_name = self._projects.itemText(current_index)
         assert project_name, "This is a bug!"
 
         return project_name
@@ -207,7 +344,10 @@ class Window(QtWidgets.QWidget):
         if name == current_project:
             return
 
-        self.refresh()
+        self.refresh(select=name)
+
+    def select_project(self, name):
+        """Set the current project and refresh the overview"""
 
         idx = self._projects.findText(name)
         if idx == -1:
@@ -220,9 +360,33 @@ class Window(QtWidgets.QWidget):
         self._overview.refresh(name)
 
     def on_project_index_changed(self):
+        if self._projects.currentIndex() == 0:
+            return
+
         project_name = self._projects.currentText()
         self._overview.refresh(project_name)
 
+    def on_project_event(self, event, name, document):
+        """Apply a single project change from the watcher"""
+
+        current_project = self._projects.currentText()
+
+        if event == REMOVED:
+            self.projects.pop(name, None)
+            if name == current_project:
+                self._projects.setCurrentIndex(0)
+            self._project_model.remove_project(name)
+
+        elif event == ADDED:
+            self.projects[name] = document["_id"]
+            self._project_model.add_project(name, document["_id"])
+
+        elif event == UPDATED:
+            self.projects[name] = document["_id"]
+            self._project_model.add_project(name, document["_id"])
+            if name == current_project:
+                self._overview.refresh(name)
+
     def on_create(self):
         create_widget = CreateProjectWidget(parent=self)
         create_widget.data_changed.connect(self.on_project_changed)
@@ -230,8 +394,29 @@ class Window(QtWidgets.QWidget):
         create_widget.show()
 
 
+def _fetch_projects():
+    """Connect to the database and list the projects, sorted by name
+
+    Returns:
+        tuple(str, list): database name and project documents
+
+    """
+
+    from cbprojectmanager import lib
+
+    lib.install()
+    lib.invalidate_cache()
+
+    projects = lib.get_projects(projection=["name"])
+
+    return lib.get_database_name(), sorted(projects, key=lambda p: p["name"])
+
+
 if __name__ == '__main__':
 
+    # Imports pymongo, which is not needed to show the window
+    from avalon import api
+
     app = QtWidgets.QApplication(sys.argv)
     print("Updating Session")
     api.Session.update({"AVALON_MONGO": "mongodb://STORAGE1:27017"})
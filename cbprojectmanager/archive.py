@@ -0,0 +1,316 @@
+"""Export projects to compressed archives and restore them
+
+An archive is a zip file with two members:
+    manifest.json       name of the project, amount of documents and the
+                        SHA-256 checksums of the documents
+    documents.bson.gz   the BSON documents of the project, gzip compressed
+
+The documents are compressed per batch into separate gzip members, the
+batches are compressed in a pool of threads. Standard gzip tools read the
+members as a single stream. Both export and import stream the documents,
+only a limited amount of batches is held in memory.
+
+Example:
+    >>> export_project("MyProject", "MyProject.zip")
+    >>> import_project("MyProject.zip", name="MyProjectRestored")
+
+"""
+
+import gzip
+import json
+import time
+import struct
+import hashlib
+import logging
+import zipfile
+import datetime
+import multiprocessing
+from collections import deque
+from concurrent import futures
+
+import bson
+
+from cbprojectmanager import lib
+
+log = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+MANIFEST = "manifest.json"
+DOCUMENTS = "documents.bson.gz"
+
+# Documents per compressed batch and per insert
+ARCHIVE_BATCH_SIZE = 1000
+
+# Compression level of gzip, 1 (fast) to 9 (small)
+COMPRESSION_LEVEL = 6
+
+
+class ArchiveError(Exception):
+    """The archive is incomplete, corrupt or of an unknown format"""
+
+
+def export_project(name, path, batch_size=None, level=None,
+                   max_workers=None):
+    """Write all documents of a project to an archive
+
+    Args:
+        name(str): name of the project collection
+        path(str): path of the archive
+        batch_size(int, optional): documents per compressed batch, see
+            ARCHIVE_BATCH_SIZE
+        level(int, optional): gzip compression level, see COMPRESSION_LEVEL
+        max_workers(int, optional): amount of threads compressing batches,
+            defaults to the amount of cores
+
+    Returns:
+        dict: the manifest with `duration` and `rate` in documents per
+            second
+
+    """
+
+    batch_size = batch_size or ARCHIVE_BATCH_SIZE
+    level = level or COMPRESSION_LEVEL
+    max_workers = max_workers or multiprocessing.cpu_count()
+
+    manifest = {"format": FORMAT_VERSION,
+                "project": name,
+                "created": datetime.datetime.utcnow().isoformat(),
+                "documents": 0,
+                "batches": 0,
+                "size": 0,
+                "compressed_size": 0,
+                "sha256": None,
+                "compressed_sha256": None,
+                "compression": "gzip",
+                "level": level}
+
+    checksum = hashlib.sha256()
+    compressed_checksum = hashlib.sha256()
+
+    def write(stream, future):
+        data, count = future.result()
+        stream.write(data)
+        compressed_checksum.update(data)
+        manifest["compressed_size"] += len(data)
+        manifest["documents"] += count
+        manifest["batches"] += 1
+
+    t1 = time.time()
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED,
+                         allowZip64=True) as archive:
+
+        stream = archive.open(DOCUMENTS, "w", force_zip64=True)
+        try:
+            with futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+
+                # Batches are written in order, keep a few per thread ahead
+                pending = deque()
+                for data in lib.iter_raw_batches(name, batch_size=batch_size):
+                    checksum.update(data)
+                    manifest["size"] += len(data)
+
+                    pending.append(pool.submit(_compress, data, level))
+                    if len(pending) >= 2 * max_workers:
+                        write(stream, pending.popleft())
+
+                while pending:
+                    write(stream, pending.popleft())
+        finally:
+            stream.close()
+
+        manifest["sha256"] = checksum.hexdigest()
+        manifest["compressed_sha256"] = compressed_checksum.hexdigest()
+
+        archive.writestr(MANIFEST, json.dumps(manifest, indent=4))
+
+    duration = time.time() - t1
+    log.info("Exported %i documents of `%s` in %.3f s"
+             % (manifest["documents"], name, duration))
+
+    return dict(manifest,
+                duration=duration,
+                rate=manifest["documents"] / max(duration, 1e-6))
+
+
+def read_manifest(path):
+    """Return the manifest of an archive
+
+    Raises:
+        ArchiveError: the file is not an archive of a supported format
+
+    """
+
+    try:
+        with zipfile.ZipFile(path, "r") as archive:
+            manifest = json.loads(archive.read(MANIFEST).decode("utf-8"))
+    except (zipfile.BadZipfile, KeyError, ValueError) as exception:
+        raise ArchiveError("`%s` is not a project archive: %s"
+                           % (path, exception))
+
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ArchiveError("Unsupported archive format `%s`"
+                           % manifest.get("format"))
+
+    return manifest
+
+
+def import_project(path, name=None, batch_size=None, verify=True,
+                   max_workers=2):
+    """Restore a project from an archive
+
+    The documents are inserted in batches into a temporary collection which
+    is renamed to the project once all documents are in and the checksums
+    match, the project never becomes partially visible. The documents keep
+    their ids.
+
+    Args:
+        path(str): path of the archive
+        name(str, optional): name of the project, defaults to the name in
+            the manifest
+        batch_size(int, optional): documents per insert, see
+            ARCHIVE_BATCH_SIZE
+        verify(bool): compare the amount of documents and the checksums
+            with the manifest
+        max_workers(int): amount of inserts running at the same time
+
+    Returns:
+        dict: amount of `documents` restored, `duration` and `rate` in
+            documents per second
+
+    Raises:
+        ArchiveError: the archive is corrupt or does not match its manifest
+
+    """
+
+    manifest = read_manifest(path)
+
+    name = name or manifest["project"]
+    batch_size = batch_size or ARCHIVE_BATCH_SIZE
+
+    if name in lib.get_collection_names():
+        raise RuntimeError("Collection with name `%s` already exists" % name)
+
+    temporary = lib.create_collection("%s.%s" % (name, bson.ObjectId()),
+                                      existing=())
+
+    checksum = hashlib.sha256()
+    compressed_checksum = hashlib.sha256()
+
+    t1 = time.time()
+    count = 0
+    project = None
+    try:
+        with zipfile.ZipFile(path, "r") as archive, \
+                archive.open(DOCUMENTS, "r") as member, \
+                futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+
+            stream = gzip.GzipFile(
+                fileobj=_ChecksumReader(member, compressed_checksum),
+                mode="rb")
+            documents = bson.decode_file_iter(
+                _ChecksumReader(stream, checksum))
+
+            pending = deque()
+            batch = []
+            for document in documents:
+                count += 1
+
+                # The project document is written last, see below
+                if document.get("type") == "project":
+                    project = document
+                    continue
+
+                batch.append(document)
+                if len(batch) >= batch_size:
+                    pending.append(pool.submit(temporary.insert_many,
+                                               batch, ordered=False))
+                    batch = []
+
+                    if len(pending) >= 2 * max_workers:
+                        pending.popleft().result()
+
+            if batch:
+                pending.append(pool.submit(temporary.insert_many,
+                                           batch, ordered=False))
+
+            while pending:
+                pending.popleft().result()
+
+        if project is None:
+            raise ArchiveError("Archive `%s` holds no project document"
+                               % path)
+
+        if verify:
+            _verify(manifest, count,
+                    checksum.hexdigest(),
+                    compressed_checksum.hexdigest())
+
+        lib.ensure_indexes(temporary)
+
+        project["name"] = name
+        temporary.insert_one(project)
+
+        temporary.rename(name)
+
+    except Exception:
+        log.error("Importing `%s` failed, dropping temporary collection"
+                  % path)
+        lib.drop_collection(temporary.name)
+        raise
+
+    lib.invalidate_project_index()
+    lib.invalidate_cache(name)
+
+    duration = time.time() - t1
+    log.info("Imported %i documents into `%s` in %.3f s"
+             % (count, name, duration))
+
+    return {"documents": count,
+            "duration": duration,
+            "rate": count / max(duration, 1e-6)}
+
+
+def _verify(manifest, count, checksum, compressed_checksum):
+    if count != manifest["documents"]:
+        raise ArchiveError("Expected %i documents, found %i"
+                           % (manifest["documents"], count))
+
+    if compressed_checksum != manifest["compressed_sha256"]:
+        raise ArchiveError("Checksum of the compressed documents does not "
+                           "match the manifest")
+
+    if checksum != manifest["sha256"]:
+        raise ArchiveError("Checksum of the documents does not match the "
+                           "manifest")
+
+
+def _compress(data, level):
+    """Compress a batch of BSON documents
+
+    Returns:
+        tuple: the gzip member and the amount of documents in the batch
+
+    """
+
+    # Walk the length prefixes of the documents
+    count = 0
+    offset = 0
+    while offset < len(data):
+        offset += struct.unpack_from("<i", data, offset)[0]
+        count += 1
+
+    return gzip.compress(data, compresslevel=level), count
+
+
+class _ChecksumReader(object):
+    """File object which updates a checksum with the data read through it"""
+
+    def __init__(self, fileobj, checksum):
+        self._fileobj = fileobj
+        self._checksum = checksum
+
+    def read(self, size=-1):
+        data = self._fileobj.read(size)
+        self._checksum.update(data)
+        return data
@@ -0,0 +1,457 @@
+"""Benchmarks of the project manager
+
+Every measurement runs in a fresh interpreter so module caches from earlier
+runs do not influence the result. Results are printed as JSON, thresholds
+can be given to fail (exit code 1) on regressions.
+
+Usage:
+    $ python -m cbprojectmanager.benchmark startup --repeat 5
+    $ python -m cbprojectmanager.benchmark startup --max-first-paint 1.5
+    $ python -m cbprojectmanager.benchmark lib --mongo mongodb://localhost
+    $ python -m cbprojectmanager.benchmark lib --mock --projects 10 100
+
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+# Modules which should not be imported before the window is painted
+HEAVY_MODULES = ["pymongo",
+                 "bson",
+                 "avalon.vendor.qtawesome",
+                 "avalon.tools.projectmanager.model",
+                 "cbprojectmanager.model"]
+
+# Scale points of the data access benchmark
+PROJECT_COUNTS = [10, 100, 1000]
+ASSET_COUNTS = [1000, 10000, 50000, 100000]
+
+# Database the data access benchmark seeds, it is dropped afterwards
+BENCHMARK_DATABASE = "cbprojectmanager_benchmark"
+BENCHMARK_CONNECTION = "benchmark"
+
+# Prefix of the seeded collections
+_PREFIX = "benchmark_"
+
+
+def _run_python(code, env=None):
+    """Run code in a new interpreter and return its JSON output"""
+
+    environment = dict(os.environ)
+    environment.update(env or {})
+
+    output = subprocess.check_output([sys.executable, "-c", code],
+                                     env=environment)
+
+    # Only the last line holds the result, ignore anything printed before
+    return json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+def _summary(samples):
+    samples = sorted(samples)
+    return {"min": samples[0],
+            "median": samples[len(samples) // 2],
+            "max": samples[-1],
+            "samples": samples}
+
+
+def measure_import(module="cbprojectmanager.app", repeat=5):
+    """Measure the time it takes to import a module
+
+    Args:
+        module(str): name of the module
+        repeat(int): amount of fresh interpreters to measure in
+
+    Returns:
+        dict: timing summary and the heavy modules which were imported
+
+    """
+
+    code = ("import json, sys, time\n"
+            "t1 = time.time()\n"
+            "import %s\n"
+            "duration = time.time() - t1\n"
+            "heavy = [m for m in %r if m in sys.modules]\n"
+            "print(json.dumps({'duration': duration, 'heavy': heavy}))\n"
+            % (module, HEAVY_MODULES))
+
+    results = [_run_python(code) for _ in range(repeat)]
+
+    summary = _summary([r["duration"] for r in results])
+    summary["heavy_modules"] = results[-1]["heavy"]
+
+    return summary
+
+
+def measure_first_paint(repeat=3):
+    """Measure the time from interpreter start until the window is painted
+
+    Runs on the offscreen Qt platform unless QT_QPA_PLATFORM is set.
+
+    Args:
+        repeat(int): amount of fresh interpreters to measure in
+
+    Returns:
+        dict: timing summary
+
+    """
+
+    code = "from cbprojectmanager import benchmark; benchmark._first_paint()"
+    env = {"QT_QPA_PLATFORM": os.environ.get("QT_QPA_PLATFORM", "offscreen")}
+
+    results = [_run_python(code, env=env) for _ in range(repeat)]
+
+    return _summary([r["duration"] for r in results])
+
+
+def _first_paint():
+    """Show the window and print the time of the first paint event"""
+
+    t1 = time.time()
+
+    from avalon.vendor.Qt import QtWidgets, QtCore
+    from cbprojectmanager import app
+
+    class PaintFilter(QtCore.QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QtCore.QEvent.Paint:
+                print(json.dumps({"duration": time.time() - t1}))
+                sys.stdout.flush()
+
+                # Do not wait for the database connection to finish
+                os._exit(0)
+
+            return False
+
+    application = QtWidgets.QApplication(sys.argv)
+
+    window = app.Window()
+    paint_filter = PaintFilter()
+    window.installEventFilter(paint_filter)
+    window.show()
+
+    application.exec_()
+
+
+def _timeit(func, repeat, setup=None):
+    """Return the timing summary of calling a function `repeat` times"""
+
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t1 = time.time()
+        func()
+        samples.append(time.time() - t1)
+
+    return _summary(samples)
+
+
+def _peak_memory(func):
+    """Return the peak amount of bytes allocated while calling a function"""
+
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _consume(iterable):
+    """Iterate without keeping the items"""
+    for _ in iterable:
+        pass
+
+
+def _read_pages(lib, project):
+    """Read all assets of a project page by page, keeping one page"""
+
+    documents, token = lib.get_asset_page(project)
+    while token is not None:
+        documents, token = lib.get_asset_page(project, resume_token=token)
+
+
+def _seed_projects(database, template, start, end):
+    """Add the projects with index `start` up to `end` to the database"""
+
+    for index in range(start, end):
+        name = "%sproject_%05i" % (_PREFIX, index)
+        document = dict(template, name=name)
+        document.pop("_id", None)
+        database[name].insert_one(document)
+
+
+def _seed_assets(database, project, start, end, batch_size=1000):
+    """Add the assets with index `start` up to `end` to a project"""
+
+    collection = database[project]
+    parent = collection.find_one({"type": "project"})["_id"]
+
+    for offset in range(start, end, batch_size):
+        collection.insert_many([
+            {"schema": "avalon-core:asset-2.0",
+             "type": "asset",
+             "name": "asset_%07i" % index,
+             "silo": "silo_%i" % (index % 4),
+             "parent": parent,
+             "data": {"visualParent": None}}
+            for index in range(offset, min(offset + batch_size, end))
+        ])
+
+
+def measure_lib(url=None, database=BENCHMARK_DATABASE, mock=False,
+                projects=None, assets=None, repeat=5):
+    """Measure the data access functions of `lib` on a seeded database
+
+    The database is seeded up to every scale point before it is measured,
+    first with projects then with assets in a single project. The database
+    must be empty, it is dropped afterwards.
+
+    The assets are read as a list, streamed and paged, with the peak memory
+    of each. mongomock materializes every query, the memory of the streamed
+    reads is only representative on a real server. At every asset scale
+    point the project is cloned as well, with its rate in documents per
+    second.
+
+    Args:
+        url(str, optional): url of the Mongo server, defaults to AVALON_MONGO
+        database(str): name of the database to seed
+        mock(bool): use an in memory mongomock database
+        projects(list, optional): amounts of projects, see PROJECT_COUNTS
+        assets(list, optional): amounts of assets, see ASSET_COUNTS
+        repeat(int): amount of calls measured per function
+
+    Returns:
+        dict: timing summaries per scale point and function
+
+    """
+
+    from cbprojectmanager import lib, connection
+
+    projects = sorted(projects or PROJECT_COUNTS)
+    assets = sorted(assets or ASSET_COUNTS)
+
+    client = None
+    if mock:
+        try:
+            import mongomock
+        except ImportError:
+            raise RuntimeError("mongomock is required for --mock")
+        client = mongomock.MongoClient()
+
+    def install():
+        lib.uninstall()
+        connection.disconnect(BENCHMARK_CONNECTION)
+        lib.install(BENCHMARK_CONNECTION,
+                    url=url,
+                    database=database,
+                    client=client)
+
+    install()
+
+    # The database is dropped afterwards, never seed one which is in use
+    db = lib._database
+    if db.collection_names(include_system_collections=False):
+        lib.uninstall()
+        connection.disconnect(BENCHMARK_CONNECTION)
+        raise RuntimeError("Database `%s` is not empty, benchmarks only run "
+                           "on a new database" % database)
+
+    template = lib.get_template()
+    template["schema"] = "avalon-core:project-2.0"
+
+    result = {"server": "mongomock" if mock else url or "AVALON_MONGO",
+              "database": database,
+              "repeat": repeat,
+              "projects": {},
+              "assets": {}}
+
+    # Time a lookup with a warm project index but no cached documents,
+    # invalidate_cache() would rebuild the index on every lookup
+    def invalidate_documents():
+        lib._cache.invalidate()
+        lib._get_project_index()
+
+    created = []
+
+    def create_project():
+        name = "%screated_%05i" % (_PREFIX, len(created))
+        created.append(name)
+        lib.create_project(name, template=template)
+
+    cloned = []
+    clone_rates = []
+
+    def clone_project():
+        name = "%sclone_%05i" % (_PREFIX, len(clone_rates))
+        cloned.append(name)
+        clone_rates.append(lib.clone_project(project, name)["rate"])
+
+    def drop_clones():
+        while cloned:
+            lib.drop_collection(cloned.pop())
+
+    try:
+        seeded = 0
+        for count in projects:
+            _seed_projects(db, template, seeded, count)
+            seeded = count
+            lib.invalidate_cache()
+
+            project = "%sproject_%05i" % (_PREFIX, count // 2)
+
+            result["projects"][str(count)] = {
+                "install": _timeit(install, repeat),
+                "get_projects": _timeit(lambda: list(lib.get_projects()),
+                                        repeat,
+                                        setup=lib.invalidate_cache),
+                "get_projects_cached_names": _timeit(
+                    lambda: list(lib.get_projects()), repeat),
+                "get_project": _timeit(lambda: lib.get_project(project),
+                                       repeat,
+                                       setup=invalidate_documents),
+                "get_project_cached": _timeit(
+                    lambda: lib.get_project(project), repeat),
+                "create_project": _timeit(create_project, repeat),
+                "get_project_template": _timeit(
+                    lambda: lib.get_project_template(project), repeat,
+                    setup=invalidate_documents),
+            }
+
+        project = "%sproject_%05i" % (_PREFIX, 0)
+        if not seeded:
+            _seed_projects(db, template, 0, 1)
+
+        seeded = 0
+        for count in assets:
+            _seed_assets(db, project, seeded, count)
+            seeded = count
+            lib.invalidate_cache()
+
+            del clone_rates[:]
+            clone = _timeit(clone_project, repeat, setup=drop_clones)
+            clone["rate"] = _summary(clone_rates)
+            drop_clones()
+
+            result["assets"][str(count)] = {
+                "clone_project": clone,
+                "get_assets": _timeit(lambda: lib.get_assets(project),
+                                      repeat,
+                                      setup=lib.invalidate_cache),
+                "iter_assets": _timeit(
+                    lambda: _consume(lib.iter_assets(project)), repeat,
+                    setup=lib.invalidate_cache),
+                "get_asset_page": _timeit(lambda: _read_pages(lib, project),
+                                          repeat,
+                                          setup=lib.invalidate_cache),
+
+                # Peak bytes allocated, the list of get_assets against the
+                # streamed and paged reads
+                "peak_memory": {
+                    "get_assets": _peak_memory(
+                        lambda: lib.get_assets(project)),
+                    "iter_assets": _peak_memory(
+                        lambda: _consume(lib.iter_assets(project))),
+                    "get_asset_page": _peak_memory(
+                        lambda: _read_pages(lib, project)),
+                },
+            }
+
+    finally:
+        lib.uninstall()
+        if mock:
+            connection.disconnect(BENCHMARK_CONNECTION)
+        else:
+            lib.install(BENCHMARK_CONNECTION)
+            lib._mongo_client.drop_database(database)
+            lib.uninstall()
+            connection.disconnect(BENCHMARK_CONNECTION)
+
+    return result
+
+
+def startup(args):
+    result = {"import": measure_import(repeat=args.repeat),
+              "first_paint": measure_first_paint(repeat=args.repeat)}
+
+    failed = []
+    if args.max_import is not None and \
+            result["import"]["median"] > args.max_import:
+        failed.append("import")
+    if args.max_first_paint is not None and \
+            result["first_paint"]["median"] > args.max_first_paint:
+        failed.append("first_paint")
+
+    result["failed"] = failed
+
+    return result
+
+
+def data_access(args):
+    return measure_lib(url=args.mongo,
+                       database=args.database,
+                       mock=args.mock,
+                       projects=args.projects,
+                       assets=args.assets,
+                       repeat=args.repeat)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cbprojectmanager.benchmark")
+    parser.add_argument("--output", help="Write the result to this file")
+
+    subparsers = parser.add_subparsers(dest="command")
+
+    startup_parser = subparsers.add_parser(
+        "startup", help="Import time and time to first paint of the window")
+    startup_parser.add_argument("--repeat", type=int, default=5)
+    startup_parser.add_argument("--max-import", type=float,
+                                help="Fail when the median import time in "
+                                     "seconds is higher")
+    startup_parser.add_argument("--max-first-paint", type=float,
+                                help="Fail when the median time to first "
+                                     "paint in seconds is higher")
+    startup_parser.set_defaults(func=startup)
+
+    lib_parser = subparsers.add_parser(
+        "lib", help="Data access functions of lib on a seeded database")
+    lib_parser.add_argument("--mongo",
+                            help="Url of the database, defaults to "
+                                 "AVALON_MONGO")
+    lib_parser.add_argument("--database", default=BENCHMARK_DATABASE,
+                            help="Empty database to seed, it is dropped "
+                                 "afterwards")
+    lib_parser.add_argument("--mock", action="store_true",
+                            help="Use an in memory mongomock database")
+    lib_parser.add_argument("--projects", type=int, nargs="+",
+                            help="Amounts of projects to measure with")
+    lib_parser.add_argument("--assets", type=int, nargs="+",
+                            help="Amounts of assets to measure with")
+    lib_parser.add_argument("--repeat", type=int, default=5)
+    lib_parser.set_defaults(func=data_access)
+
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.print_help()
+        return 1
+
+    result = args.func(args)
+
+    text = json.dumps(result, indent=4, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+    return 1 if result.get("failed") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Small in-process cache for documents fetched from the database"""
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class Cache(object):
+    """Thread safe key / value store with TTL and LRU eviction
+
+    Entries expire `ttl` seconds after they have been stored. When the cache
+    holds more than `maxsize` entries the least recently used entry is
+    evicted.
+
+    Args:
+        maxsize(int): maximum amount of entries
+        ttl(float): time in seconds an entry stays valid, None for no expiry
+
+    """
+
+    def __init__(self, maxsize=512, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key, default=None, count=True):
+        """Return the value stored for key or the default when not found
+
+        Args:
+            key(hashable): key of the entry
+            default(object): value returned when the key is not cached
+            count(bool): update the hit / miss counters
+
+        Returns:
+            object
+
+        """
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.time():
+                    self._data.move_to_end(key)
+                    if count:
+                        self.hits += 1
+                    return value
+
+                self._data.pop(key)
+
+            if count:
+                self.misses += 1
+
+            return default
+
+    def set(self, key, value):
+        expires = None if self.ttl is None else time.time() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate(self, match=None):
+        """Remove entries from the cache
+
+        Args:
+            match(callable, optional): function called with each key, the
+                entry is removed if it returns True. All entries are removed
+                when no function is given.
+
+        Returns:
+            None
+
+        """
+
+        with self._lock:
+            if match is None:
+                self._data.clear()
+                return
+
+            for key in [k for k in self._data if match(k)]:
+                self._data.pop(key)
+
+    def stats(self):
+        """Return the hit / miss counters and size of the cache"""
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl}
+
+
+_MISSING = object()
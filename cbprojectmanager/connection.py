@@ -0,0 +1,248 @@
+"""Shared, pooled connections to one or more Mongo databases
+
+Connections are registered by name and reused by every caller, pymongo's
+client is thread safe and keeps a pool of sockets per server. The pool
+size, timeouts and retry behaviour can be configured per connection, the
+defaults are taken from DEFAULT_OPTIONS.
+
+Example:
+    >>> connection = connect("farm", url="mongodb://farm:27017",
+    ...                      database="avalon", max_pool_size=20)
+    >>> connection.database["MyProject"].find_one({"type": "project"})
+
+"""
+
+import sys
+import time
+import logging
+import threading
+from collections import deque
+
+import pymongo
+
+from avalon import api
+
+log = logging.getLogger(__name__)
+
+self = sys.modules[__name__]
+self._connections = {}
+self._locks = {}
+self._lock = threading.Lock()
+
+DEFAULT_NAME = "default"
+DEFAULT_DATABASE = "avalon"
+
+DEFAULT_OPTIONS = {
+    # Sockets kept open per server
+    "max_pool_size": 100,
+    "min_pool_size": 0,
+    # Timeouts in milliseconds
+    "server_selection_timeout": 1000,
+    "connect_timeout": 2000,
+    "socket_timeout": None,
+    # Attempts to reach the server and the delay in seconds before the
+    # first retry, the delay doubles every attempt up to max_backoff
+    "retries": 3,
+    "backoff": 0.5,
+    "max_backoff": 8.0,
+}
+
+# Amount of ping latencies kept per connection
+LATENCY_SAMPLES = 100
+
+
+class Connection(object):
+    """A named client and database
+
+    Args:
+        name(str): name of the connection
+        url(str): url of the Mongo server
+        database(str): name of the database
+        client(pymongo.MongoClient, optional): existing client to use, for
+            example a mongomock client
+        **options: overrides of DEFAULT_OPTIONS
+
+    """
+
+    def __init__(self, name, url, database, client=None, **options):
+        unknown = set(options) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise TypeError("Unknown connection options: %s"
+                            % ", ".join(sorted(unknown)))
+
+        self.name = name
+        self.url = url
+        self.database_name = database
+        self.options = dict(DEFAULT_OPTIONS, **options)
+
+        self.client = client
+        self.connect_latency = None
+        self.attempts = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    @property
+    def database(self):
+        return self.client[self.database_name]
+
+    def connect(self):
+        """Create the client and wait until the server responds
+
+        Raises:
+            IOError: the server could not be reached in the given retries
+
+        """
+
+        options = self.options
+
+        created = self.client is None
+        if created:
+            kwargs = {
+                "maxPoolSize": options["max_pool_size"],
+                "minPoolSize": options["min_pool_size"],
+                "serverSelectionTimeoutMS": options["server_selection_timeout"],
+                "connectTimeoutMS": options["connect_timeout"],
+            }
+            if options["socket_timeout"] is not None:
+                kwargs["socketTimeoutMS"] = options["socket_timeout"]
+
+            self.client = pymongo.MongoClient(self.url, **kwargs)
+
+        t1 = time.time()
+        delay = options["backoff"]
+        for attempt in range(1, options["retries"] + 1):
+            self.attempts = attempt
+            try:
+                self.ping()
+            except Exception as exception:
+                if attempt == options["retries"]:
+                    # Do not leave the client and its monitor threads behind
+                    if created:
+                        self.client.close()
+                        self.client = None
+
+                    raise IOError(
+                        "ERROR: Couldn't connect to %s in %i attempts, "
+                        "%.3f s: %s" % (self.url, attempt,
+                                        time.time() - t1, exception))
+
+                log.error("Retrying in %.1f s.." % delay)
+                time.sleep(delay)
+                delay = min(delay * 2, options["max_backoff"])
+            else:
+                break
+
+        self.connect_latency = time.time() - t1
+        log.info("Connected to %s, delay %.3f s"
+                 % (self.url, self.connect_latency))
+
+    def ping(self):
+        """Send a ping to the server and record the round trip time
+
+        Returns:
+            float: latency in seconds
+
+        """
+
+        t1 = time.time()
+        self.client.admin.command("ping")
+        latency = time.time() - t1
+        self.latencies.append(latency)
+
+        return latency
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+
+    def stats(self):
+        """Return the connection latency metrics"""
+
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+
+        return {
+            "name": self.name,
+            "url": self.url,
+            "database": self.database_name,
+            "attempts": self.attempts,
+            "connect_latency": self.connect_latency,
+            "pings": count,
+            "ping_min": latencies[0] if count else None,
+            "ping_max": latencies[-1] if count else None,
+            "ping_mean": sum(latencies) / count if count else None,
+            "ping_p95": latencies[int(count * 0.95)] if count else None,
+            "max_pool_size": self.options["max_pool_size"],
+        }
+
+
+def connect(name=DEFAULT_NAME, url=None, database=None, client=None,
+            **options):
+    """Return the connection with the given name, connecting if needed
+
+    The url and database default to AVALON_MONGO and AVALON_DB of the
+    session, AVALON_TIMEOUT is used as server selection timeout when set.
+    Options are only applied when the connection is created. Connecting
+    only blocks other callers of the same name.
+
+    Args:
+        name(str): name of the connection
+        url(str, optional): url of the Mongo server
+        database(str, optional): name of the database
+        client(pymongo.MongoClient, optional): existing client to use
+        **options: overrides of DEFAULT_OPTIONS
+
+    Returns:
+        Connection
+
+    """
+
+    with self._lock:
+        connection = self._connections.get(name)
+        if connection is not None:
+            return connection
+
+        lock = self._locks.setdefault(name, threading.Lock())
+
+    with lock:
+        # Another thread may have connected while waiting for the lock
+        connection = self._connections.get(name)
+        if connection is not None:
+            return connection
+
+        if "AVALON_TIMEOUT" in api.Session:
+            options.setdefault("server_selection_timeout",
+                               int(api.Session["AVALON_TIMEOUT"]))
+
+        connection = Connection(
+            name,
+            url or api.Session.get("AVALON_MONGO"),
+            database or api.Session.get("AVALON_DB", DEFAULT_DATABASE),
+            client=client,
+            **options)
+        connection.connect()
+
+        with self._lock:
+            self._connections[name] = connection
+
+    return connection
+
+
+def get_connection(name=DEFAULT_NAME):
+    """Return a registered connection, None when it does not exist"""
+    return self._connections.get(name)
+
+
+def disconnect(name=None):
+    """Close a connection or all connections when no name is given"""
+
+    with self._lock:
+        names = list(self._connections) if name is None else [name]
+        for key in names:
+            connection = self._connections.pop(key, None)
+            if connection is not None:
+                connection.close()
+
+
+def get_stats():
+    """Return the latency metrics of all connections"""
+    return [c.stats() for c in list(self._connections.values())]
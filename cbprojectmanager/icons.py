@@ -0,0 +1,112 @@
+"""Process wide registry of the fontawesome icons
+
+The charmap of the font is parsed once and every icon is rendered once per
+color, the same QIcon is returned for later requests.
+
+Example:
+    >>> icon = get_icon("cubes", color=colors.default)
+
+"""
+
+import os
+import sys
+import json
+import threading
+
+from avalon.vendor.Qt import QtCore
+
+self = sys.modules[__name__]
+self._charmap = None
+self._names = None
+self._icons = {}
+self._lock = threading.Lock()
+
+
+def get_charmap():
+    """Return the fontawesome charmap, icon name and code pairs
+
+    Returns:
+        dict
+
+    """
+
+    if self._charmap is None:
+        with self._lock:
+            if self._charmap is None:
+                from avalon.vendor import qtawesome as qta
+
+                package = os.path.dirname(qta.__file__)
+                path = os.path.join(package, "fonts",
+                                    "fontawesome-webfont-charmap.json")
+
+                with open(path, "r") as f:
+                    self._charmap = json.load(f)
+
+    return self._charmap
+
+
+def get_icon_names():
+    """Return the sorted names of all icons"""
+
+    if self._names is None:
+        self._names = sorted(get_charmap())
+
+    return self._names
+
+
+def get_icon(name, color=None):
+    """Return the icon with the given name, rendered in the given color
+
+    Args:
+        name(str): name of the icon without the `fa.` prefix
+        color(str, optional): color of the icon
+
+    Returns:
+        QtGui.QIcon
+
+    """
+
+    key = (name, color)
+    icon = self._icons.get(key)
+    if icon is None:
+        from avalon.vendor import qtawesome as qta
+
+        options = {} if color is None else {"color": color}
+        icon = qta.icon("fa.{}".format(name), **options)
+        self._icons[key] = icon
+
+    return icon
+
+
+class IconModel(QtCore.QAbstractListModel):
+    """List of all icon names, icons are only rendered when requested
+
+    Args:
+        color(str, optional): color of the icons
+        placeholder(bool): add an empty first row for "no icon"
+        parent(QtCore.QObject, optional): parent of the model
+
+    """
+
+    def __init__(self, color=None, placeholder=True, parent=None):
+        super(IconModel, self).__init__(parent)
+
+        self._color = color
+        self._names = ([""] if placeholder else []) + get_icon_names()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._names)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+
+        if not index.isValid():
+            return
+
+        name = self._names[index.row()]
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return name
+
+        if role == QtCore.Qt.DecorationRole and name:
+            return get_icon(name, self._color)
@@ -0,0 +1,368 @@
+"""Timings of the database library and the Mongo commands it sends
+
+When enabled every public function of `lib` is wrapped to record its
+latency, the amount of round trips to the server and the bytes sent and
+received during the call. A pymongo command listener records the same per
+command. Calls slower than SLOW_THRESHOLD are logged and kept in a list of
+recent slow operations.
+
+The command listener is registered with pymongo globally, only clients
+created after `enable` report their commands. Enable the instrumentation
+before `lib.install`, or set CBPROJECTMANAGER_INSTRUMENT=1 to let the
+window enable it on start up.
+
+Nested calls are recorded for every function, the round trips of
+`get_project` also count for the `create_projects` call it is part of.
+
+Example:
+    >>> enable()
+    >>> lib.install()
+    >>> project = lib.get_project("MyProject")
+    >>> get_stats()["functions"]["get_project"]["round_trips"]
+    1
+
+"""
+
+import os
+import sys
+import time
+import inspect
+import logging
+import functools
+import threading
+from collections import deque
+
+import bson
+from pymongo import monitoring
+
+log = logging.getLogger(__name__)
+
+# Calls taking longer than this amount of seconds are logged
+SLOW_THRESHOLD = float(os.environ.get("CBPROJECTMANAGER_SLOW_THRESHOLD", 0.5))
+
+# Amount of slow operations kept
+SLOW_SAMPLES = 100
+
+# Upper bounds in seconds of the latency histogram buckets
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05,
+           0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+self = sys.modules[__name__]
+self._enabled = False
+self._listener = None
+self._originals = {}
+self._functions = {}
+self._commands = {}
+self._slow = deque(maxlen=SLOW_SAMPLES)
+self._lock = threading.Lock()
+self._local = threading.local()
+
+
+class Histogram(object):
+    """Latency distribution over the fixed BUCKETS"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, duration):
+        index = 0
+        while index < len(BUCKETS) and duration > BUCKETS[index]:
+            index += 1
+
+        self.counts[index] += 1
+        self.count += 1
+        self.total += duration
+        self.min = duration if self.min is None else min(self.min, duration)
+        self.max = duration if self.max is None else max(self.max, duration)
+
+    def percentile(self, fraction):
+        """Return the upper bound of the bucket holding the percentile"""
+
+        if not self.count:
+            return None
+
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKETS[index] if index < len(BUCKETS) else self.max
+
+        return self.max
+
+    def to_dict(self):
+        labels = ["<=%gms" % (bound * 1000) for bound in BUCKETS] + \
+                 [">%gms" % (BUCKETS[-1] * 1000)]
+
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "histogram": dict(zip(labels, self.counts)),
+        }
+
+
+class _Metrics(object):
+    """Counters of a single function or command"""
+
+    def __init__(self):
+        self.histogram = Histogram()
+        self.errors = 0
+        self.round_trips = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def to_dict(self):
+        result = self.histogram.to_dict()
+        result.update({"errors": self.errors,
+                       "round_trips": self.round_trips,
+                       "bytes_sent": self.bytes_sent,
+                       "bytes_received": self.bytes_received})
+        return result
+
+
+class _Call(object):
+    """Round trips and bytes of a running function call"""
+
+    __slots__ = ("round_trips", "bytes_sent", "bytes_received")
+
+    def __init__(self):
+        self.round_trips = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+class CommandListener(monitoring.CommandListener):
+    """Record the latency and size of every command sent to the server"""
+
+    def __init__(self):
+        self._sizes = {}
+
+    def started(self, event):
+        if is_enabled():
+            self._sizes[event.request_id] = _size(event.command)
+
+    def succeeded(self, event):
+        sent = self._sizes.pop(event.request_id, None)
+        if sent is not None:
+            _record_command(event, sent, _size(event.reply), error=False)
+
+    def failed(self, event):
+        sent = self._sizes.pop(event.request_id, None)
+        if sent is not None:
+            _record_command(event, sent, 0, error=True)
+
+
+def _size(document):
+    try:
+        return len(bson.BSON.encode(document))
+    except Exception:
+        return 0
+
+
+def enable(module=None):
+    """Start recording the calls of `lib` and the commands it sends
+
+    Args:
+        module(module, optional): module to instrument, defaults to `lib`
+
+    """
+
+    if self._listener is None:
+        self._listener = CommandListener()
+        monitoring.register(self._listener)
+
+    if module is None:
+        from cbprojectmanager import lib as module
+
+    instrument_module(module)
+    self._enabled = True
+
+
+def disable():
+    """Stop recording and restore the original functions"""
+
+    self._enabled = False
+
+    for (module, name), func in list(self._originals.items()):
+        setattr(module, name, func)
+    self._originals.clear()
+
+
+def is_enabled():
+    return self._enabled
+
+
+def reset():
+    """Clear all recorded metrics"""
+
+    with self._lock:
+        self._functions.clear()
+        self._commands.clear()
+        self._slow.clear()
+
+
+def get_stats():
+    """Return the recorded metrics
+
+    Returns:
+        dict: per function and per command metrics, latencies in seconds,
+            and the recent slow operations
+
+    """
+
+    with self._lock:
+        return {
+            "enabled": self._enabled,
+            "slow_threshold": SLOW_THRESHOLD,
+            "functions": {name: metrics.to_dict() for name, metrics
+                          in self._functions.items()},
+            "commands": {name: metrics.to_dict() for name, metrics
+                         in self._commands.items()},
+            "slow": list(self._slow),
+        }
+
+
+def instrument_module(module):
+    """Replace the public functions of a module with timed versions"""
+
+    for name, func in list(vars(module).items()):
+        if name.startswith("_") or not inspect.isfunction(func):
+            continue
+        if func.__module__ != module.__name__:
+            continue
+        if (module, name) in self._originals:
+            continue
+
+        self._originals[(module, name)] = func
+        setattr(module, name, timed(func))
+
+
+def timed(func):
+    """Decorator recording the latency and round trips of a function
+
+    The iteration of a generator is recorded as a single call, the time
+    the consumer spends between the items is not counted.
+
+    """
+
+    name = func.__name__
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            call = _start()
+            t1 = time.time()
+            duration = 0.0
+            error = False
+            try:
+                for item in func(*args, **kwargs):
+                    # Do not count the work of the consumer
+                    _stop(call)
+                    duration += time.time() - t1
+                    yield item
+                    t1 = time.time()
+                    _push(call)
+                duration += time.time() - t1
+            except Exception:
+                error = True
+                duration += time.time() - t1
+                raise
+            finally:
+                _stop(call)
+                _record(name, duration, call, error)
+
+        return wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        call = _start()
+        t1 = time.time()
+        error = False
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            _stop(call)
+            _record(name, time.time() - t1, call, error)
+
+    return wrapper
+
+
+def _start():
+    call = _Call()
+    _push(call)
+    return call
+
+
+def _push(call):
+    calls = getattr(self._local, "calls", None)
+    if calls is None:
+        calls = self._local.calls = []
+    calls.append(call)
+
+
+def _stop(call):
+    calls = getattr(self._local, "calls", [])
+    if call in calls:
+        calls.remove(call)
+
+
+def _record_command(event, sent, received, error):
+    with self._lock:
+        metrics = self._commands.get(event.command_name)
+        if metrics is None:
+            metrics = self._commands[event.command_name] = _Metrics()
+
+        metrics.histogram.add(event.duration_micros / 1e6)
+        metrics.round_trips += 1
+        metrics.bytes_sent += sent
+        metrics.bytes_received += received
+        if error:
+            metrics.errors += 1
+
+    # Commands are reported in the thread which sent them
+    for call in getattr(self._local, "calls", ()):
+        call.round_trips += 1
+        call.bytes_sent += sent
+        call.bytes_received += received
+
+
+def _record(name, duration, call, error):
+    if not self._enabled:
+        return
+
+    with self._lock:
+        metrics = self._functions.get(name)
+        if metrics is None:
+            metrics = self._functions[name] = _Metrics()
+
+        metrics.histogram.add(duration)
+        metrics.round_trips += call.round_trips
+        metrics.bytes_sent += call.bytes_sent
+        metrics.bytes_received += call.bytes_received
+        if error:
+            metrics.errors += 1
+
+    if duration > SLOW_THRESHOLD:
+        operation = {"function": name,
+                     "duration": duration,
+                     "round_trips": call.round_trips,
+                     "bytes_sent": call.bytes_sent,
+                     "bytes_received": call.bytes_received,
+                     "time": time.time()}
+        self._slow.append(operation)
+
+        log.warning("Slow call lib.%(function)s: %(duration).3f s, "
+                    "%(round_trips)i round trips, %(bytes_sent)i bytes "
+                    "sent, %(bytes_received)i bytes received" % operation)
@@ -6,84 +6,130 @@ Note :
     finished.
 
 """
+import csv
 import json
 import os
 import sys
 import time
+import threading
 from copy import deepcopy
+from concurrent import futures
 import logging
 
 import pymongo
 import bson
 
-from avalon import api, schema
+from avalon import schema
+
+from cbprojectmanager import connection
+from cbprojectmanager.cache import Cache
 
-__DATABASE_NAME = "avalon"
 self = sys.modules[__name__]
 self._mongo_client = None
 self._database = None
 self._is_installed = False
+self._supports_union = True
+self._supports_facet = True
+self._project_index = None
+self._invalidate_callbacks = []
+self._templates = {}
+self._validators = threading.local()
 
-log = logging.getLogger(__name__)
+# Amount of seconds cached project documents and collection names are valid
+CACHE_TTL = 60
+CACHE_SIZE = 512
 
+self._cache = Cache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
 
-def install():
-    """Establish a connection with the database"""
+# Amount of collections combined in a single project query
+PROJECT_BATCH_SIZE = 100
 
-    if self._is_installed:
-        return
+# Documents per round trip when streaming assets and default page size
+ASSET_BATCH_SIZE = 1000
+ASSET_PAGE_SIZE = 500
 
-    mongo_url = api.Session["AVALON_MONGO"]
+# Documents per insert when importing assets, amount of errors reported
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_MAX_ERRORS = 100
 
-    timeout = 1000
-    self._mongo_client = pymongo.MongoClient(mongo_url,
-                                             serverSelectionTimeoutMS=timeout)
+# Documents per insert when cloning a project
+CLONE_BATCH_SIZE = 1000
 
-    for retry in range(3):
-        try:
-            t1 = time.time()
-            self._mongo_client.server_info()
+# Directories with project templates, see `get_template`
+TEMPLATE_DIRS = [os.path.join(os.path.dirname(__file__), "res")]
+_TEMPLATE_SUFFIX = "_template.json"
 
-        except Exception:
-            log.error("Retrying..")
-            time.sleep(1)
-            timeout *= 1.5
+# Fields stored in the asset hierarchy and fields which are indexed
+HIERARCHY_FIELDS = ["name", "silo", "parent", "data.visualParent"]
+INDEXED_FIELDS = ["type", "silo", "parent", "data.visualParent"]
 
-        else:
-            break
+# Temporary key used to tag aggregated documents with their collection
+_COLLECTION_KEY = "__collection__"
+
+# Error code of the server for an unknown aggregation stage
+_UNRECOGNIZED_STAGE = 40324
+
+log = logging.getLogger(__name__)
 
-    else:
-        raise IOError(
-            "ERROR: Couldn't connect to %s in "
-            "less than %.3f ms" % (mongo_url, timeout))
 
-    log.info("Connected to %s, delay %.3f s" % (mongo_url, time.time() - t1))
+def install(name=connection.DEFAULT_NAME, **options):
+    """Establish a connection with the database
 
-    database_name = api.Session.get("AVALON_DB", __DATABASE_NAME)
-    self._database = self._mongo_client[database_name]
+    The connection is taken from the shared connection pool, see
+    `cbprojectmanager.connection.connect` for the options.
+
+    Args:
+        name(str): name of the connection to use
+        **options: passed on to `connection.connect`
+
+    """
+
+    if self._is_installed:
+        return
+
+    conn = connection.connect(name, **options)
+
+    self._mongo_client = conn.client
+    self._database = conn.database
 
     self._is_installed = True
 
 
+def uninstall():
+    """Forget the current database, the connection itself stays open"""
+
+    self._mongo_client = None
+    self._database = None
+    self._is_installed = False
+    self._supports_union = True
+    self._supports_facet = True
+
+    invalidate_cache()
+
+
 def get_database_name():
     return self._database.name
 
 
-def create_collection(name):
+def create_collection(name, existing=None):
     """Create a new collection in the current database
 
     Args:
         name(str): name of the new collection
+        existing(list, optional): names of the existing collections, fetched
+            from the database when not given
 
     """
 
+    if existing is None:
+        existing = get_collection_names()
+
     # Check if name is not already taken
-    collections = list(self._database.collection_names())
-    if name in collections:
+    if name in existing:
         raise RuntimeError("Collection with name `%s` already exists" % name)
 
     collection = self._database.create_collection(name)
-    assert get_collection(name), "This is a bug!"
+    invalidate_cache(name)
 
     return collection
 
@@ -91,12 +137,90 @@ def create_collection(name):
 def drop_collection(nam_or_collection):
     self._database.drop_collection(nam_or_collection)
 
+    name = getattr(nam_or_collection, "name", nam_or_collection)
+    _unindex_collection(name)
+    invalidate_cache(name)
+
+
+def get_collection_names():
+    """Return the names of all collections in the current database
+
+    The result is cached, see `invalidate_cache`.
+
+    Returns:
+        list
+
+    """
+
+    key = ("collections", self._database.name)
+    names = self._cache.get(key)
+    if names is None:
+        names = [name for name in self._database.collection_names()
+                 if name not in ("system.indexes",)]
+        self._cache.set(key, names)
+
+    return list(names)
+
+
+def invalidate_cache(name=None):
+    """Remove cached documents and notify the registered callbacks
+
+    The collection name list is always invalidated as creating or dropping a
+    project changes it.
+
+    Args:
+        name(str, optional): name of the project, all projects when None
+
+    Returns:
+        None
+
+    """
+
+    if name is None:
+        self._cache.invalidate()
+        invalidate_project_index()
+    else:
+        self._cache.invalidate(lambda key: key[0] == "collections" or
+                               key[1] == name)
+
+    for callback in list(self._invalidate_callbacks):
+        try:
+            callback(name)
+        except Exception:
+            log.exception("Error in cache invalidation callback")
+
+
+def register_invalidate_callback(callback):
+    """Register a function which is called when the cache is invalidated
+
+    Args:
+        callback(callable): function accepting the project name, the name is
+            None when the whole cache is invalidated
+
+    Returns:
+        None
+
+    """
+
+    if callback not in self._invalidate_callbacks:
+        self._invalidate_callbacks.append(callback)
+
+
+def deregister_invalidate_callback(callback):
+    if callback in self._invalidate_callbacks:
+        self._invalidate_callbacks.remove(callback)
+
+
+def get_cache_stats():
+    """Return the hit / miss counters of the document cache"""
+    return self._cache.stats()
+
 
 def create_project_definition(collection, data):
     """Create a project definition in the given colleciton
 
     When giving a divert keys, the function will temporarely take this
-    information from the data to ensure `schema.validate` is successful.
+    information from the data to ensure `validate` is successful.
 
     Args:
         collection(pymongo.collection.Collection): collection from database
@@ -109,7 +233,7 @@ def create_project_definition(collection, data):
 
     # Validate data for project
     data["schema"] = "avalon-core:project-2.0"
-    schema.validate(data)
+    validate(data)
 
     # Check if the name is unique
     exists = collection.find_one({"type": "project", "name": data["name"]})
@@ -121,6 +245,9 @@ def create_project_definition(collection, data):
     assert result.acknowledged, ("Could not create project definition, "
                                  "please contact a Pipeline TD!")
 
+    _index_project(data["name"], collection.name)
+    invalidate_cache(data["name"])
+
     return result.inserted_id
 
 
@@ -136,6 +263,24 @@ def create_project(name, template=None):
 
     """
 
+    collection = create_collection(name)
+    try:
+        _create_project(collection, template)
+    except Exception as exception:
+        print("Ran into a little problem!")
+        print(exception)
+        print(".. Dropped collection")
+        drop_collection(name)
+
+        return False
+
+    return True
+
+
+def _create_project(collection, template=None, project_data=None):
+    """Create the indexes and project definition in a new collection"""
+
+    name = collection.name
     if template:
         data = deepcopy(template)
         data.update({"name": name})
@@ -149,24 +294,96 @@ def create_project(name, template=None):
                     "apps": []
                 }}
 
-    collection = create_collection(name)
-    try:
-        create_project_definition(collection, data)
-    except Exception as exception:
-        print("Ran into a little problem!")
-        print(exception)
-        print(".. Dropped collection")
-        drop_collection(name)
+    if project_data:
+        data.setdefault("data", {}).update(project_data)
 
-        return False
+    ensure_indexes(collection)
+    create_project_definition(collection, data)
 
-    return True
+
+def create_projects(specs, max_workers=4):
+    """Create multiple projects concurrently
+
+    The collection names are fetched once for all projects. A project
+    which fails is dropped again and reported, the other projects are
+    created regardless.
+
+    A spec is either the name of the project or a dictionary with:
+        name(str): name of the project
+        template(dict, str, optional): template data or the name of an
+            existing project to use as template
+        data(dict, optional): values to update the project's data with
+
+    Args:
+        specs(list): project specs
+        max_workers(int): amount of projects created at the same time
+
+    Returns:
+        list of dict: a report per spec, in the order of the specs, with
+            the keys `name`, `success`, `error` and `duration`
+
+    """
+
+    specs = [{"name": spec} if isinstance(spec, str) else spec
+             for spec in specs]
+
+    existing = set(get_collection_names())
+    templates = {}
+
+    reports = []
+    jobs = []
+    for spec in specs:
+        name = spec.get("name")
+        report = {"name": name,
+                  "success": False,
+                  "error": None,
+                  "duration": 0.0}
+        reports.append(report)
+
+        if not name:
+            report["error"] = "Missing project name"
+        elif name in existing:
+            report["error"] = "Collection with name `%s` already " \
+                              "exists" % name
+        else:
+            existing.add(name)
+            jobs.append((spec, report))
+
+    def create(spec, report):
+        t1 = time.time()
+        name = spec["name"]
+        template = spec.get("template")
+        try:
+            if isinstance(template, str):
+                # Only fetch the template of a project once
+                if template not in templates:
+                    templates[template] = get_project_template(template)
+                template = templates[template]
+
+            collection = create_collection(name, existing=())
+            try:
+                _create_project(collection, template, spec.get("data"))
+            except Exception:
+                drop_collection(name)
+                raise
+
+        except Exception as exception:
+            log.debug("Failed to create project `%s`" % name, exc_info=True)
+            report["error"] = str(exception)
+        else:
+            report["success"] = True
+
+        report["duration"] = time.time() - t1
+
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for result in [executor.submit(create, *job) for job in jobs]:
+            result.result()
+
+    return reports
 
 
 def get_collection(name):
-    exists = next(c for c in self._database.collection_names()
-                  if c == name)
-    if not exists:
+    if name not in get_collection_names():
         raise RuntimeError("Could not find collection with name `%s`" % name)
 
     collection = self._database.get_collection(name)
@@ -174,53 +391,344 @@ def get_collection(name):
     return collection
 
 
-def get_project(name):
+def get_project(name, projection=None):
     """Get the project document by name
 
+    The collection of the project is looked up in the project index, the
+    document itself is fetched with a single query. Documents are cached,
+    a copy of the cached document is returned.
+
     Args:
         name(str): name of the project
+        projection(list, dict, optional): fields to return
     Returns:
         dict
 
     """
-    projects = [p for p in list(get_projects()) if p["name"] == name]
-    if len(projects) == 1:
-        return projects[0]
 
-    return
+    key = ("project", name, _projection_key(projection))
+    document = self._cache.get(key)
+    if document is None:
+        collection_name = _get_project_index().get(name)
+        if collection_name is None:
+            return
+
+        document = self._database[collection_name].find_one(
+            {"type": "project", "name": name}, projection)
+        if document is None:
+            return
 
+        self._cache.set(key, document)
 
-def get_projects():
+    return deepcopy(document)
+
+
+def _projection_key(projection):
+    """Return a hashable representation of a projection"""
+    if projection is None:
+        return None
+    if isinstance(projection, dict):
+        return tuple(sorted(projection.items()))
+    return tuple(sorted(projection))
+
+
+def _get_project_index():
+    """Return the project name to collection name lookup
+
+    The index is built once from all collections and kept up to date by
+    `create_project_definition` and `drop_collection`. Names which occur in
+    multiple collections are ambiguous and map to None.
+
+    Returns:
+        dict
+
+    """
+
+    if self._project_index is None:
+        index = {}
+        for collection_name, document in iter_projects(projection=["name"]):
+            name = document["name"]
+            if name in index:
+                log.warning("Project name `%s` found in multiple "
+                            "collections" % name)
+                collection_name = None
+            index[name] = collection_name
+
+        self._project_index = index
+
+    return self._project_index
+
+
+def invalidate_project_index():
+    """Force the project index to be rebuilt on the next lookup"""
+    self._project_index = None
+
+
+def _index_project(name, collection_name):
+    if self._project_index is None:
+        return
+
+    if name in self._project_index:
+        collection_name = None
+    self._project_index[name] = collection_name
+
+
+def _unindex_collection(collection_name):
+    if self._project_index is None:
+        return
+
+    # An ambiguous name could be resolved now, rebuild to be sure
+    if None in self._project_index.values():
+        invalidate_project_index()
+        return
+
+    for name, indexed in list(self._project_index.items()):
+        if indexed == collection_name:
+            self._project_index.pop(name)
+
+
+def get_projects(projection=None, batch_size=None):
     """List available projects
 
+    The project documents are collected with a single aggregation per batch
+    of collections, see `iter_projects`.
+
+    Args:
+        projection(list, dict, optional): fields to return, by default the
+            whole document is returned
+        batch_size(int, optional): number of collections to query per round
+            trip, defaults to PROJECT_BATCH_SIZE
+
+    Returns:
+        generator of project documents
+
+    """
+
+    for _, document in iter_projects(projection, batch_size):
+        yield document
+
+
+def iter_projects(projection=None, batch_size=None, names=None):
+    """Yield the collection name and project document of each project
+
+    Each collection holds exactly one project document. In stead of querying
+    every collection separately the collections are combined with the
+    `$unionWith` stage, reducing the amount of round trips to one per batch.
+    Servers which do not support `$unionWith` (MongoDB < 4.4, mongomock) fall
+    back to a `find_one` per collection.
+
+    Args:
+        projection(list, dict, optional): fields to return
+        batch_size(int, optional): number of collections per aggregation
+        names(list, optional): collections to look in, defaults to the
+            cached collection names of the database
+
     Returns:
-        list of project documents
+        generator of tuple(str, dict)
 
     """
 
-    for project in self._database.collection_names():
-        if project in ("system.indexes",):
+    batch_size = batch_size or PROJECT_BATCH_SIZE
+
+    if names is None:
+        names = get_collection_names()
+    for start in range(0, len(names), batch_size):
+        batch = names[start:start + batch_size]
+        if self._supports_union:
+            try:
+                for item in _aggregate_projects(batch, projection):
+                    yield item
+                continue
+            except (pymongo.errors.OperationFailure,
+                    NotImplementedError) as exception:
+                if not _is_unsupported_stage(exception):
+                    raise
+                log.debug("Falling back to a query per collection: %s"
+                          % exception)
+                self._supports_union = False
+
+        for name in batch:
+            document = self._database[name].find_one({"type": "project"},
+                                                      projection)
+            if document is not None:
+                yield name, document
+
+
+def _is_unsupported_stage(exception):
+    """Return whether an aggregation failed on a stage the server lacks"""
+
+    if isinstance(exception, NotImplementedError):
+        return True
+
+    return getattr(exception, "code", None) == _UNRECOGNIZED_STAGE
+
+
+def _aggregate_projects(names, projection=None):
+    """Get the project documents of multiple collections in one round trip
+
+    Args:
+        names(list): names of the collections to include
+        projection(list, dict, optional): fields to return
+
+    Returns:
+        list of tuple(str, dict)
+
+    """
+
+    if isinstance(projection, (list, tuple)):
+        projection = {key: 1 for key in projection}
+
+    def pipeline(name):
+        stages = [{"$match": {"type": "project"}},
+                  {"$limit": 1},
+                  {"$addFields": {_COLLECTION_KEY: {"$literal": name}}}]
+        if projection:
+            fields = dict(projection)
+            if any(fields.values()):
+                fields[_COLLECTION_KEY] = 1
+            stages.append({"$project": fields})
+        return stages
+
+    first, others = names[0], names[1:]
+    stages = pipeline(first)
+    for name in others:
+        stages.append({"$unionWith": {"coll": name,
+                                      "pipeline": pipeline(name)}})
+
+    # Exhaust the cursor here so a failing stage is raised before anything
+    # has been yielded by the caller
+    result = []
+    for document in self._database[first].aggregate(stages):
+        name = document.pop(_COLLECTION_KEY)
+        result.append((name, document))
+
+    return result
+
+
+def get_template(name="base"):
+    """Get a project template from the template directories
+
+    A template named `base` is stored as `base_template.json`. Loaded
+    templates are cached and only read again when the file was modified.
+
+    Args:
+        name(str): name of the template
+
+    Returns:
+        dict
+
+    """
+
+    path = _find_template(name)
+    mtime = os.path.getmtime(path)
+
+    cached = self._templates.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, "r") as f:
+            template = json.load(f)
+
+        cached = (mtime, template)
+        self._templates[path] = cached
+
+    return deepcopy(cached[1])
+
+
+def get_template_dirs():
+    """Return the directories templates are searched in, in order
+
+    Directories in the CBPROJECTMANAGER_TEMPLATES environment variable come
+    before TEMPLATE_DIRS.
+
+    """
+
+    paths = os.environ.get("CBPROJECTMANAGER_TEMPLATES", "")
+    return [p for p in paths.split(os.pathsep) if p] + TEMPLATE_DIRS
+
+
+def list_templates():
+    """Return the names of the available templates"""
+
+    names = set()
+    for directory in get_template_dirs():
+        if not os.path.isdir(directory):
             continue
+        for filename in os.listdir(directory):
+            if filename.endswith(_TEMPLATE_SUFFIX):
+                names.add(filename[:-len(_TEMPLATE_SUFFIX)])
 
-        # Each collection will have exactly one project document
-        document = self._database[project].find_one({
-            "type": "project"
-        })
+    return sorted(names)
 
-        if document is not None:
-            yield document
+
+def _find_template(name):
+    for directory in get_template_dirs():
+        path = os.path.join(directory, name + _TEMPLATE_SUFFIX)
+        if os.path.isfile(path):
+            return path
+
+    raise ValueError("Could not find template `%s`" % name)
+
+
+def validate(data):
+    """Validate a document against the avalon schema it refers to
+
+    The validator of a schema is compiled once per thread and reused, in
+    stead of being recreated for every call as `schema.validate` does. When
+    the schemas of avalon are not available `schema.validate` is used.
+
+    Args:
+        data(dict): document with a `schema` key, e.g.
+            "avalon-core:project-2.0"
+
+    Raises:
+        ValidationError: the document does not match the schema
+
+    """
+
+    validator = _get_validator(data["schema"].rsplit(":", 1)[-1] + ".json")
+    if validator is None:
+        schema.validate(data)
+        return
+
+    validator.validate(data)
 
 
-def get_template():
-    """Get the project template from resources"""
+def _get_validator(name):
+    """Return the compiled validator of a schema, None when not available"""
 
-    module_dir = os.path.dirname(__file__)
-    template_path = os.path.join(module_dir, "res", "base_template.json")
+    # The reference resolver of a validator is not thread safe
+    validators = getattr(self._validators, "cache", None)
+    if validators is None:
+        validators = self._validators.cache = {}
 
-    with open(template_path, "r") as f:
-        template = json.load(f)
+    if name not in validators:
+        try:
+            from avalon.vendor import jsonschema
+        except ImportError:
+            jsonschema = None
+
+        # The schemas are loaded on import of avalon.schema, load them
+        # again for schemas which were added since
+        store = schema._cache
+        if name not in store:
+            schema._precache()
+
+        definition = store.get(name)
+        if jsonschema is None or definition is None:
+            log.debug("No precompiled validator for `%s`" % name)
+            validator = None
+        else:
+            # Same resolver and types as avalon's schema.validate
+            cls = jsonschema.validators.validator_for(definition)
+            resolver = jsonschema.RefResolver("", None,
+                                              store=store,
+                                              cache_remote=True)
+            validator = cls(definition,
+                            resolver=resolver,
+                            types={"array": (list, tuple)})
 
-    return template
+        validators[name] = validator
+
+    return validators[name]
 
 
 def get_project_template(name_or_project):
@@ -238,8 +746,10 @@ def get_project_template(name_or_project):
     """
     if isinstance(name_or_project, str):
         document = get_project(name_or_project)
+        if document is None:
+            raise ValueError("Could not find project `%s`" % name_or_project)
     elif isinstance(name_or_project, dict):
-        document = name_or_project
+        document = deepcopy(name_or_project)
     else:
         raise TypeError("Input type `%s` not supported" % type(name_or_project))
 
@@ -250,6 +760,149 @@ def get_project_template(name_or_project):
     return document
 
 
+def clone_project(source, name, batch_size=None):
+    """Copy a project with all its documents to a new project
+
+    The documents are streamed in batches into a temporary collection while
+    their `_id`, `parent` and `data.visualParent` references are remapped
+    to new ids. The project document is written last, after which the
+    temporary collection is renamed to the new project in one atomic
+    operation. On failure the temporary collection is dropped, the new
+    project never becomes partially visible.
+
+    Args:
+        source(str): name of the project to copy
+        name(str): name of the new project
+        batch_size(int, optional): documents per insert, defaults to
+            CLONE_BATCH_SIZE
+
+    Returns:
+        dict: amount of `documents` copied, `duration` and `rate` in
+            documents per second
+
+    """
+
+    batch_size = batch_size or CLONE_BATCH_SIZE
+
+    collection_name = _get_project_index().get(source)
+    if collection_name is None:
+        raise ValueError("Could not find project `%s`" % source)
+
+    existing = get_collection_names()
+    if name in existing:
+        raise RuntimeError("Collection with name `%s` already exists" % name)
+
+    source_collection = self._database[collection_name]
+    temporary = self._database["%s.%s" % (name, bson.ObjectId())]
+
+    # Old id -> new id, filled on first sight of either the document or a
+    # reference to it so the order of the documents does not matter
+    ids = {}
+
+    def remap(value):
+        if not isinstance(value, bson.ObjectId):
+            return value
+        if value not in ids:
+            ids[value] = bson.ObjectId()
+        return ids[value]
+
+    def convert(document):
+        document["_id"] = remap(document["_id"])
+        if "parent" in document:
+            document["parent"] = remap(document["parent"])
+
+        data = document.get("data")
+        if isinstance(data, dict) and "visualParent" in data:
+            data["visualParent"] = remap(data["visualParent"])
+
+        return document
+
+    t1 = time.time()
+    count = 0
+    try:
+        project = source_collection.find_one({"type": "project"})
+        project = convert(project)
+        project["name"] = name
+
+        cursor = source_collection.find({"type": {"$ne": "project"}},
+                                        batch_size=batch_size)
+        batch = []
+        for document in cursor:
+            batch.append(convert(document))
+            if len(batch) >= batch_size:
+                temporary.insert_many(batch, ordered=False)
+                count += len(batch)
+                batch = []
+
+        if batch:
+            temporary.insert_many(batch, ordered=False)
+            count += len(batch)
+
+        ensure_indexes(temporary)
+
+        temporary.insert_one(project)
+        count += 1
+
+        temporary.rename(name)
+
+    except Exception:
+        log.error("Cloning `%s` failed, dropping temporary collection"
+                  % source)
+        self._database.drop_collection(temporary.name)
+        raise
+
+    _index_project(name, name)
+    invalidate_cache(name)
+
+    duration = time.time() - t1
+    log.info("Cloned %i documents from `%s` to `%s` in %.3f s"
+             % (count, source, name, duration))
+
+    return {"documents": count,
+            "duration": duration,
+            "rate": count / duration if duration else 0.0}
+
+
+def iter_raw_batches(name, query=None, batch_size=None):
+    """Yield batches of BSON encoded documents of a collection
+
+    The documents are not decoded, when the server does not support raw
+    batches the documents are encoded again.
+
+    Args:
+        name(str): name of the collection
+        query(dict, optional): filter of the documents
+        batch_size(int, optional): documents per batch, defaults to
+            ASSET_BATCH_SIZE
+
+    Yields:
+        bytes: concatenated BSON documents
+
+    """
+
+    collection = get_collection(name)
+    query = query or {}
+    batch_size = batch_size or ASSET_BATCH_SIZE
+
+    try:
+        cursor = collection.find_raw_batches(query, batch_size=batch_size)
+        for data in cursor:
+            yield data
+        return
+    except (AttributeError, NotImplementedError):
+        pass
+
+    batch = []
+    for document in collection.find(query, batch_size=batch_size):
+        batch.append(bson.BSON.encode(document))
+        if len(batch) >= batch_size:
+            yield b"".join(batch)
+            batch = []
+
+    if batch:
+        yield b"".join(batch)
+
+
 def get_assets(project, silo=None):
     """Fetch all tje assets of a project
 
@@ -258,26 +911,541 @@ def get_assets(project, silo=None):
         silo(str): name of the silo
 
     Returns:
+        list
+
+    """
+
+    return list(iter_assets(project, silo=silo))
+
+
+def iter_assets(project, silo=None, projection=None, sort=None,
+                batch_size=None, query=None):
+    """Stream the assets of a project
+
+    In stead of materializing all documents the cursor is consumed lazily,
+    fetching `batch_size` documents per round trip.
+
+    Args:
+        project(str): project name
+        silo(str, optional): name of the silo
+        projection(list, dict, optional): fields to return
+        sort(list, optional): list of (key, direction) pairs, sorted on the
+            server
+        batch_size(int, optional): documents per round trip, defaults to
+            ASSET_BATCH_SIZE
+        query(dict, optional): additional filter
+
+    Returns:
+        generator of asset documents
+
+    """
+
+    cursor = self._database[project].find(
+        _asset_query(project, silo, query),
+        projection,
+        sort=sort,
+        batch_size=batch_size or ASSET_BATCH_SIZE)
+
+    try:
+        for document in cursor:
+            yield document
+    finally:
+        cursor.close()
+
+
+def get_asset_page(project, page_size=None, resume_token=None, silo=None,
+                   projection=None, sort_key="name",
+                   direction=pymongo.ASCENDING, query=None):
+    """Fetch a single page of assets
+
+    Pages are fetched with range queries on the sort key (keyset
+    pagination) so deep pages are as fast as the first one and the result is
+    stable when documents are added in the meanwhile. The `_id` is used as
+    tie breaker, the sort key should be present in every document.
+
+    Args:
+        project(str): project name
+        page_size(int, optional): amount of documents, defaults to
+            ASSET_PAGE_SIZE
+        resume_token(dict, optional): token returned with the previous page
+        silo(str, optional): name of the silo
+        projection(list, dict, optional): fields to return
+        sort_key(str): field to sort on
+        direction(int): pymongo.ASCENDING or pymongo.DESCENDING
+        query(dict, optional): additional filter
+
+    Returns:
+        tuple(list, dict): documents and the token for the next page, the
+            token is None when this was the last page
 
     """
 
-    with_parent = {}
-    if project not in self._database:
+    page_size = page_size or ASSET_PAGE_SIZE
+
+    conditions = [_asset_query(project, silo, query)]
+    if resume_token is not None:
+        operator = "$gt" if direction == pymongo.ASCENDING else "$lt"
+        if sort_key == "_id":
+            conditions.append({"_id": {operator: resume_token["_id"]}})
+        else:
+            value = resume_token["key"]
+            conditions.append({"$or": [
+                {sort_key: {operator: value}},
+                {sort_key: value, "_id": {operator: resume_token["_id"]}}
+            ]})
+
+    sort = [(sort_key, direction)]
+    if sort_key != "_id":
+        sort.append(("_id", direction))
+
+    # Ensure the sort key is returned to build the resume token
+    if isinstance(projection, (list, tuple)):
+        projection = list(projection) + [sort_key]
+    elif isinstance(projection, dict) and any(projection.values()):
+        projection = dict(projection, **{sort_key: 1})
+
+    documents = list(self._database[project].find(
+        {"$and": conditions} if len(conditions) > 1 else conditions[0],
+        projection,
+        sort=sort,
+        limit=page_size,
+        batch_size=page_size))
+
+    if len(documents) < page_size:
+        return documents, None
+
+    last = documents[-1]
+    token = {"_id": last["_id"]}
+    if sort_key != "_id":
+        token["key"] = _get_field(last, sort_key)
+
+    return documents, token
+
+
+def _asset_query(project, silo=None, query=None):
+    """Return the filter for the assets of a project"""
+
+    with_silo = {}
+    if project not in get_collection_names():
         raise ValueError("Project is not in this database")
 
     if silo:
-        try:
-            document = next(d for d in self._database[project].distinct("silo")
-                            if d["name"] == silo)
-        except StopIteration:
+        # Distinct on the indexed field, fetched again when a silo is not
+        # in the cached list as it may have been added since
+        key = ("silos", project)
+        silos = self._cache.get(key)
+        if silos is None or silo not in silos:
+            silos = get_silos(project)
+            self._cache.set(key, silos)
+
+        if silo not in silos:
             raise ValueError("Given silo `%s` not found in project `%s`"
                              % (silo, project))
 
-        with_parent = {"parent": document["_id"]}
+        with_silo = {"silo": silo}
 
-    query = {"type": "asset"}
-    query.update(with_parent)
-
-    result = list(self._database[project].find(query))
+    result = {"type": "asset"}
+    result.update(with_silo)
+    result.update(query or {})
 
     return result
+
+
+def _get_field(document, key):
+    """Get the value of a dotted key from a document"""
+    value = document
+    for part in key.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+class AssetHierarchy(object):
+    """In memory lookup of the assets of a project
+
+    The parent of an asset is the asset it is visually nested under
+    (`data.visualParent`), assets without one are the roots of their silo.
+    Only the fields in HIERARCHY_FIELDS are stored per asset.
+
+    Args:
+        documents(iterable): asset documents
+
+    """
+
+    def __init__(self, documents):
+        self.documents = {}
+        self.silos = {}
+        self.children = {}
+
+        for document in documents:
+            _id = document["_id"]
+            self.documents[_id] = document
+            self.silos.setdefault(document.get("silo"), [])
+
+            parent = document.get("data", {}).get("visualParent")
+            if parent is None:
+                self.silos[document.get("silo")].append(_id)
+            else:
+                self.children.setdefault(parent, []).append(_id)
+
+    def get_silos(self):
+        return sorted(silo for silo in self.silos if silo is not None)
+
+    def get_roots(self, silo):
+        """Return the assets directly under a silo"""
+        return [self.documents[_id] for _id in self.silos.get(silo, [])]
+
+    def get_children(self, parent):
+        """Return the assets directly under the asset with the given id"""
+        return [self.documents[_id] for _id in self.children.get(parent, [])]
+
+
+def get_asset_hierarchy(project):
+    """Return the asset hierarchy of a project
+
+    The hierarchy is built from a single aggregation and cached, see
+    `invalidate_cache`.
+
+    Args:
+        project(str): project name
+
+    Returns:
+        AssetHierarchy
+
+    """
+
+    key = ("hierarchy", project)
+    hierarchy = self._cache.get(key)
+    if hierarchy is None:
+        pipeline = [{"$match": {"type": "asset"}},
+                    {"$project": {field: 1 for field in HIERARCHY_FIELDS}}]
+        cursor = self._database[project].aggregate(
+            pipeline, batchSize=ASSET_BATCH_SIZE)
+
+        hierarchy = AssetHierarchy(cursor)
+        self._cache.set(key, hierarchy)
+
+    return hierarchy
+
+
+def get_last_modified(project):
+    """Return the creation time of the newest document in a project
+
+    Documents do not store a modification time, the time is taken from the
+    highest ObjectId which only requires a walk of the `_id` index.
+
+    Args:
+        project(str): project name
+
+    Returns:
+        datetime.datetime or None
+
+    """
+
+    document = self._database[project].find_one({}, ["_id"],
+                                                 sort=[("_id", -1)])
+    if document is None or not isinstance(document["_id"], bson.ObjectId):
+        return
+
+    return document["_id"].generation_time
+
+
+def get_project_statistics(project):
+    """Return document counts of a project computed on the server
+
+    All counts are computed in a single `$facet` aggregation, servers which
+    do not support `$facet` run one aggregation per count.
+
+    Args:
+        project(str): project name
+
+    Returns:
+        dict: with the keys
+            documents: amount of documents per type
+            silos: amount of assets per silo
+            tasks: amount of assets per task name
+            assets: total amount of assets
+            assets_without_tasks: amount of assets without tasks
+            max_tasks: highest amount of tasks of a single asset
+
+    """
+
+    assets = {"$match": {"type": "asset"}}
+    facets = {
+        "documents": [
+            {"$group": {"_id": "$type", "count": {"$sum": 1}}}
+        ],
+        "silos": [
+            assets,
+            {"$group": {"_id": "$silo", "count": {"$sum": 1}}}
+        ],
+        "tasks": [
+            assets,
+            {"$unwind": "$data.tasks"},
+            {"$group": {"_id": "$data.tasks", "count": {"$sum": 1}}}
+        ],
+        "task_counts": [
+            assets,
+            {"$project": {"count": {"$size": {
+                "$ifNull": ["$data.tasks", []]}}}},
+            {"$group": {"_id": None,
+                        "assets": {"$sum": 1},
+                        "max_tasks": {"$max": "$count"},
+                        "without": {"$sum": {"$cond": [
+                            {"$eq": ["$count", 0]}, 1, 0]}}}}
+        ]
+    }
+
+    collection = self._database[project]
+    if self._supports_facet:
+        try:
+            result = next(collection.aggregate([{"$facet": facets}]))
+        except (pymongo.errors.OperationFailure,
+                NotImplementedError) as exception:
+            if not _is_unsupported_stage(exception):
+                raise
+            log.debug("Falling back to an aggregation per count: %s"
+                      % exception)
+            self._supports_facet = False
+
+    if not self._supports_facet:
+        result = {key: list(collection.aggregate(pipeline))
+                  for key, pipeline in facets.items()}
+
+    def counts(key):
+        return {str(item["_id"]): item["count"] for item in result[key]}
+
+    task_counts = result["task_counts"][0] if result["task_counts"] else {}
+
+    return {"documents": counts("documents"),
+            "silos": counts("silos"),
+            "tasks": counts("tasks"),
+            "assets": task_counts.get("assets", 0),
+            "assets_without_tasks": task_counts.get("without", 0),
+            "max_tasks": task_counts.get("max_tasks", 0)}
+
+
+def get_statistics(projects=None, max_workers=8):
+    """Return the statistics of multiple projects
+
+    The projects are processed concurrently, one aggregation per project.
+
+    Args:
+        projects(list, optional): names of the projects, all projects when
+            not given
+        max_workers(int): amount of projects processed at the same time
+
+    Returns:
+        dict: statistics per project name, see `get_project_statistics`
+
+    """
+
+    index = _get_project_index()
+    if projects is None:
+        projects = sorted(name for name, collection in index.items()
+                          if collection is not None)
+    else:
+        projects = list(projects)
+
+    def process(name):
+        collection_name = index.get(name)
+        if collection_name is None:
+            raise ValueError("Could not find project `%s`" % name)
+        return get_project_statistics(collection_name)
+
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(process, projects)
+        return dict(zip(projects, results))
+
+
+def get_silos(project):
+    """Return the sorted names of the silos in a project
+
+    Uses the index on `silo`, the assets themselves are not fetched.
+
+    Args:
+        project(str): project name
+
+    Returns:
+        list
+
+    """
+
+    silos = self._database[project].distinct("silo", {"type": "asset"})
+    return sorted(silo for silo in silos if silo is not None)
+
+
+def get_children(project, parent):
+    """Return the assets nested directly under the given asset
+
+    Args:
+        project(str): project name
+        parent(bson.ObjectId): id of the parent asset
+
+    Returns:
+        list
+
+    """
+
+    return get_asset_hierarchy(project).get_children(parent)
+
+
+def ensure_indexes(name_or_collection):
+    """Create the indexes used to query assets in a project collection
+
+    Args:
+        name_or_collection(str, pymongo.collection.Collection): collection
+
+    Returns:
+        None
+
+    """
+
+    collection = name_or_collection
+    if isinstance(collection, str):
+        collection = self._database[collection]
+
+    for key in INDEXED_FIELDS:
+        collection.create_index(key)
+
+
+def import_assets(project, path, chunk_size=None, file_format=None):
+    """Import assets from a CSV or JSON lines file
+
+    The file is read as a stream and written in chunks with unordered
+    `insert_many` calls, memory use only depends on the chunk size.
+
+    Every row becomes an asset document parented to the project. A row
+    needs a `name` and `silo`, all other columns (a `data.` prefix is
+    stripped) or the `data` object of a JSON line end up in the asset's
+    data. Rows which do not pass `avalon-core:asset-2.0` validation are
+    skipped and reported.
+
+    Args:
+        project(str): name of the project
+        path(str): path to a .csv, .json or .jsonl file
+        chunk_size(int, optional): documents per insert, defaults to
+            IMPORT_CHUNK_SIZE
+        file_format(str, optional): "csv" or "jsonl", based on the file
+            extension when not given
+
+    Returns:
+        dict: report with the counts of `read`, `inserted`, `invalid` and
+            `failed` rows, the first `errors`, `duration` and `rate` in
+            documents per second
+
+    """
+
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+
+    document = get_project(project, projection=["_id"])
+    if document is None:
+        raise ValueError("Could not find project `%s`" % project)
+
+    collection = self._database[project]
+
+    if file_format is None:
+        extension = os.path.splitext(path)[-1].lower()
+        file_format = "csv" if extension == ".csv" else "jsonl"
+
+    report = {"read": 0,
+              "inserted": 0,
+              "invalid": 0,
+              "failed": 0,
+              "errors": [],
+              "duration": 0.0,
+              "rate": 0.0}
+
+    def add_error(line, message):
+        if len(report["errors"]) < IMPORT_MAX_ERRORS:
+            report["errors"].append("line %i: %s" % (line, message))
+
+    def flush(chunk):
+        if not chunk:
+            return
+        try:
+            result = collection.insert_many([d for _, d in chunk],
+                                            ordered=False)
+            report["inserted"] += len(result.inserted_ids)
+        except pymongo.errors.BulkWriteError as exception:
+            details = exception.details
+            report["inserted"] += details.get("nInserted", 0)
+            for error in details.get("writeErrors", []):
+                report["failed"] += 1
+                add_error(chunk[error["index"]][0], error.get("errmsg"))
+
+        elapsed = max(time.time() - t1, 1e-6)
+        log.info("Imported %i documents, %.0f documents/s"
+                 % (report["inserted"], report["inserted"] / elapsed))
+
+    t1 = time.time()
+    chunk = []
+    with open(path, "r") as f:
+        if file_format == "csv":
+            rows = enumerate(csv.DictReader(f), 2)
+        else:
+            # Lines are parsed per row below, a malformed line is invalid
+            rows = ((line, row)
+                    for line, row in enumerate(f, 1) if row.strip())
+
+        for line, row in rows:
+            report["read"] += 1
+            try:
+                if file_format != "csv":
+                    row = json.loads(row)
+                    if not isinstance(row, dict):
+                        raise ValueError("Expected an object, got %s"
+                                         % type(row).__name__)
+
+                asset = _asset_document(row, document["_id"])
+                validate(asset)
+            except Exception as exception:
+                report["invalid"] += 1
+                add_error(line, exception)
+                continue
+
+            chunk.append((line, asset))
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+
+    flush(chunk)
+
+    invalidate_cache(project)
+
+    report["duration"] = time.time() - t1
+    if report["duration"]:
+        report["rate"] = report["inserted"] / report["duration"]
+
+    return report
+
+
+def _asset_document(row, parent):
+    """Convert an imported row to an asset document
+
+    Raises:
+        ValueError: the row has no name or silo
+
+    """
+
+    for key in ("name", "silo"):
+        if not row.get(key):
+            raise ValueError("Row has no `%s`" % key)
+
+    data = dict(row.get("data") or {})
+    for key, value in row.items():
+        if key in ("name", "silo", "data", "type", "schema", "parent"):
+            continue
+        if value in ("", None):
+            continue
+        if key.startswith("data."):
+            key = key[len("data."):]
+        data[key] = value
+
+    return {"schema": "avalon-core:asset-2.0",
+            "type": "asset",
+            "name": row.get("name"),
+            "silo": row.get("silo"),
+            "parent": parent,
+            "data": data}
@@ -1,7 +1,20 @@
 import logging
+from functools import partial
+from collections import OrderedDict
 
+from avalon.vendor.Qt import QtCore
+from avalon.style import colors
 from avalon.tools.projectmanager.model import TreeModel, Node
 
+from cbprojectmanager import icons
+from cbprojectmanager.worker import get_executor
+
+# Kept importable from here, they live in a module without avalon's models
+from cbprojectmanager.projectmodel import (  # noqa: F401
+    ProjectModel,
+    ProjectFilterModel
+)
+
 log = logging.getLogger(__name__)
 
 
@@ -13,20 +26,22 @@ class TaskModel(TreeModel):
         super(TaskModel, self).__init__()
 
         self._icons = {
-            "__default__": qta.icon("fa.folder-o", color=colors.default)
+            "__default__": icons.get_icon("folder-o", color=colors.default)
         }
 
         self._get_task_icons()
 
     def _get_task_icons(self):
-        # Get the project configured icons from database
+        from avalon import io
+
+        # Get the project configured icons from database, the icons are
+        # shared through the icon registry
         project = io.find_one({"type": "project"})
         tasks = project['config'].get('tasks', [])
         for task in tasks:
             icon_name = task.get("icon", None)
             if icon_name:
-                icon = qta.icon("fa.{}".format(icon_name),
-                                    color=colors.default)
+                icon = icons.get_icon(icon_name, color=colors.default)
                 self._icons[task["name"]] = icon
 
     def data(self, index, role):
@@ -39,4 +54,271 @@ class TaskModel(TreeModel):
             if index.column() == 0:
                 return index.internalPointer()['icon']
 
-        return super(TaskModel, self).data(index, role)
\ No newline at end of file
+        return super(TaskModel, self).data(index, role)
+
+
+class _LazyNode(object):
+    """Item of the AssetTreeModel"""
+
+    __slots__ = ["document", "parent", "children", "row", "query",
+                 "token", "fetched", "loading", "generation"]
+
+    def __init__(self, document, parent, query, row=0):
+        self.document = document
+        self.parent = parent
+        self.children = []
+
+        # Children are only appended or all removed, the row stays valid
+        self.row = row
+
+        # Filter of the children and resume token of the next page
+        self.query = query
+        self.token = None
+        self.fetched = False
+        self.loading = False
+
+        # Raised when the children are unloaded, pages fetched for an
+        # earlier generation are discarded
+        self.generation = 0
+
+    def count(self):
+        """Amount of loaded nodes below this node"""
+        return sum(1 + child.count() for child in self.children)
+
+
+class AssetTreeModel(QtCore.QAbstractItemModel):
+    """Asset hierarchy of a project which is loaded on demand
+
+    The silos are the top level items, below them the assets are nested by
+    `data.visualParent`. Children are fetched in pages through
+    `lib.get_asset_page` on the query executor when a view expands an item.
+    Expanded subtrees stay loaded, collapsed subtrees are unloaded again
+    when more than `max_nodes` items are loaded, least recently collapsed
+    first. Use `connect_view` to let the model follow expand and collapse.
+
+    Args:
+        page_size(int): amount of children fetched per page
+        max_nodes(int): amount of loaded items before collapsed subtrees
+            are unloaded
+        parent(QtCore.QObject, optional): parent of the model
+
+    """
+
+    COLUMNS = ["name", "label"]
+    FIELDS = ["name", "silo", "data.label", "data.visualParent"]
+
+    DocumentRole = QtCore.Qt.UserRole + 1
+
+    def __init__(self, page_size=200, max_nodes=50000, parent=None):
+        super(AssetTreeModel, self).__init__(parent)
+
+        self.page_size = page_size
+        self.max_nodes = max_nodes
+
+        self._project = None
+        self._root = _LazyNode(None, None, None)
+        self._loaded = 0
+        self._collapsed = OrderedDict()
+
+    def set_project(self, project):
+        """Clear the model and load the silos of the given project"""
+
+        self.beginResetModel()
+        self._project = project
+        self._root = _LazyNode(None, None, None)
+        self._loaded = 0
+        self._collapsed.clear()
+        self.endResetModel()
+
+    def connect_view(self, view):
+        view.expanded.connect(self.on_expanded)
+        view.collapsed.connect(self.on_collapsed)
+
+    # Qt model interface
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        node = self._node(parent)
+        if row < 0 or row >= len(node.children):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+
+        node = index.internalPointer().parent
+        if node is None or node is self._root:
+            return QtCore.QModelIndex()
+
+        return self.createIndex(node.row, 0, node)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self._node(parent).children)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and \
+                orientation == QtCore.Qt.Horizontal:
+            return self.COLUMNS[section]
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+
+        if not index.isValid():
+            return
+
+        document = index.internalPointer().document
+        if role == self.DocumentRole:
+            return document
+
+        if role == QtCore.Qt.DisplayRole:
+            key = self.COLUMNS[index.column()]
+            if key == "name":
+                return document["name"]
+            return document.get("data", {}).get(key)
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        node = self._node(parent)
+        if node is self._root:
+            return self._project is not None
+        return bool(node.children) or not node.fetched
+
+    def canFetchMore(self, parent):
+        node = self._node(parent)
+        if node is self._root and self._project is None:
+            return False
+        return not node.fetched and not node.loading
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        if node.fetched or node.loading:
+            return
+
+        from cbprojectmanager import lib
+
+        node.loading = True
+        project = self._project
+
+        if node is self._root:
+            func = lib.get_silos
+            args = (project,)
+        else:
+            func = lib.get_asset_page
+            args = (project, self.page_size, node.token)
+
+        kwargs = {} if node is self._root else {"projection": self.FIELDS,
+                                                "query": node.query}
+
+        get_executor().submit(func,
+                              args=args,
+                              kwargs=kwargs,
+                              callback=partial(self._on_fetched, project,
+                                               node, node.generation),
+                              error=partial(self._on_fetch_failed, node,
+                                            node.generation))
+
+    # Expand, collapse and eviction
+
+    def on_expanded(self, index):
+        self._collapsed.pop(id(self._node(index)), None)
+
+    def on_collapsed(self, index):
+        node = self._node(index)
+        self._collapsed.pop(id(node), None)
+        self._collapsed[id(node)] = node
+
+    def _node(self, index):
+        if index.isValid():
+            return index.internalPointer()
+        return self._root
+
+    def _index(self, node):
+        if node is self._root:
+            return QtCore.QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def _on_fetched(self, project, node, generation, result):
+        # The children were unloaded while this page was fetched
+        if generation != node.generation:
+            return
+
+        node.loading = False
+
+        # The project changed or the node was unloaded in the meanwhile
+        if project != self._project or not self._is_attached(node):
+            return
+
+        first = len(node.children)
+        if node is self._root:
+            children = [
+                _LazyNode({"name": silo, "silo": silo}, node,
+                          {"silo": silo, "data.visualParent": None},
+                          row=first + i)
+                for i, silo in enumerate(result)
+            ]
+            node.fetched = True
+        else:
+            documents, node.token = result
+            children = [
+                _LazyNode(document, node,
+                          {"data.visualParent": document["_id"]},
+                          row=first + i)
+                for i, document in enumerate(documents)
+            ]
+            node.fetched = node.token is None
+
+        if children:
+            self.beginInsertRows(self._index(node),
+                                 first, first + len(children) - 1)
+            node.children.extend(children)
+            self.endInsertRows()
+
+        self._loaded += len(children)
+
+        if not node.children:
+            # Remove the expand indicator of an item without children
+            index = self._index(node)
+            self.dataChanged.emit(index, index)
+
+        self._evict()
+
+    def _on_fetch_failed(self, node, generation, exception):
+        if generation == node.generation:
+            node.loading = False
+        log.error("Could not fetch assets: %s" % exception)
+
+    def _is_attached(self, node):
+        # Unloaded nodes are detached from their parent, see `_forget`
+        while node.parent is not None:
+            node = node.parent
+        return node is self._root
+
+    def _evict(self):
+        """Unload collapsed subtrees until the budget is met"""
+
+        while self._loaded > self.max_nodes and self._collapsed:
+            _, node = self._collapsed.popitem(last=False)
+            if not node.children or not self._is_attached(node):
+                continue
+
+            removed = node.count()
+            self.beginRemoveRows(self._index(node),
+                                 0, len(node.children) - 1)
+            self._forget(node)
+            node.children = []
+            self.endRemoveRows()
+
+            node.token = None
+            node.fetched = False
+            node.loading = False
+            node.generation += 1
+            self._loaded -= removed
+
+    def _forget(self, node):
+        for child in node.children:
+            self._collapsed.pop(id(child), None)
+            self._forget(child)
+            child.parent = None
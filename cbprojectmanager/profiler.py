@@ -0,0 +1,348 @@
+"""Responsiveness of the user interface
+
+When enabled the slots of the window and the overview are timed and the
+event loop is watched for stalls: a timer fires every HEARTBEAT_INTERVAL
+milliseconds, when it fires late the event loop was blocked. Everything is
+recorded as a timeline in the Chrome trace format, it is written on exit
+and can be opened in chrome://tracing or https://ui.perfetto.dev.
+
+The profiler is enabled by the window when CBPROJECTMANAGER_PROFILE is set
+to the path of the trace file. For CI it can run the window headless on the
+offscreen Qt platform.
+
+Usage:
+    $ CBPROJECTMANAGER_PROFILE=trace.json python -m cbprojectmanager.app
+    $ python -m cbprojectmanager.profiler --duration 10 --cycle \\
+        --output trace.json
+
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import inspect
+import logging
+import argparse
+import functools
+import threading
+
+log = logging.getLogger(__name__)
+
+# Milliseconds between the heartbeats of the event loop
+HEARTBEAT_INTERVAL = 10
+
+# A heartbeat later than this amount of milliseconds is recorded as a stall
+STALL_THRESHOLD = 50
+
+# Slots which are timed, per module and class
+SLOTS = [
+    ("cbprojectmanager.app", "Window", ["refresh",
+                                        "on_project_changed",
+                                        "on_project_index_changed",
+                                        "on_project_event",
+                                        "on_create",
+                                        "select_project",
+                                        "populate_projects",
+                                        "_on_refreshed"]),
+    ("cbprojectmanager.widgets", "OverviewWidget", ["refresh",
+                                                    "set_data",
+                                                    "_on_provided"]),
+]
+
+self = sys.modules[__name__]
+self._profiler = None
+
+
+class Profiler(object):
+    """Timeline of timed slots and event loop stalls
+
+    Args:
+        output(str, optional): path the trace is written to on exit
+
+    """
+
+    def __init__(self, output=None):
+        self.output = output
+        self.events = []
+        self.stalls = []
+
+        self._start = time.time()
+        self._lock = threading.Lock()
+        self._originals = []
+        self._timer = None
+        self._last_beat = None
+
+    def add_event(self, name, category, start, duration, args=None):
+        """Add a complete event, times in seconds since the epoch"""
+
+        event = {"name": name,
+                 "cat": category,
+                 "ph": "X",
+                 "ts": (start - self._start) * 1e6,
+                 "dur": duration * 1e6,
+                 "pid": os.getpid(),
+                 "tid": threading.current_thread().ident}
+        if args:
+            event["args"] = args
+
+        with self._lock:
+            self.events.append(event)
+
+    def wrap_slots(self, slots=None):
+        """Replace the slots on their classes with timed versions
+
+        Only connections made afterwards use the timed slots, wrap the
+        slots before the widgets are created.
+
+        """
+
+        for module_name, class_name, names in slots or SLOTS:
+            __import__(module_name)
+            cls = getattr(sys.modules[module_name], class_name)
+            for name in names:
+                original = cls.__dict__.get(name)
+                if original is None:
+                    continue
+
+                self._originals.append((cls, name, original))
+                setattr(cls, name, self.timed(original,
+                                              "%s.%s" % (class_name, name)))
+
+    def unwrap_slots(self):
+        for cls, name, original in reversed(self._originals):
+            setattr(cls, name, original)
+        self._originals = []
+
+    def timed(self, func, name):
+        """Return a version of a function which is added to the timeline
+
+        Qt passes a slot as many arguments of the signal as it accepts, the
+        wrapper accepts any amount. Arguments the function does not take,
+        like the `checked` of `clicked(bool)`, are dropped.
+
+        """
+
+        code = getattr(func, "__code__", None)
+        if code is None or code.co_flags & inspect.CO_VARARGS:
+            count = None
+        else:
+            count = code.co_argcount
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if count is not None:
+                args = args[:count]
+
+            t1 = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add_event(name, "slot", t1, time.time() - t1)
+
+        return wrapper
+
+    def start_heartbeat(self):
+        """Watch the event loop of the running application for stalls"""
+
+        from avalon.vendor.Qt import QtCore
+
+        timer = QtCore.QTimer()
+        timer.setInterval(HEARTBEAT_INTERVAL)
+        timer.timeout.connect(self._on_heartbeat)
+        timer.start()
+
+        self._timer = timer
+        self._last_beat = time.time()
+
+    def stop_heartbeat(self):
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+
+    def _on_heartbeat(self):
+        now = time.time()
+        delay = now - self._last_beat - HEARTBEAT_INTERVAL / 1000.0
+        self._last_beat = now
+
+        if delay * 1000 > STALL_THRESHOLD:
+            self.stalls.append(delay)
+            self.add_event("stall", "event loop", now - delay, delay)
+
+    def summary(self):
+        """Return the stall and slot durations in seconds"""
+
+        stalls = sorted(self.stalls)
+        count = len(stalls)
+
+        slots = {}
+        for event in self.events:
+            if event["cat"] != "slot":
+                continue
+            durations = slots.setdefault(event["name"], [])
+            durations.append(event["dur"] / 1e6)
+
+        return {
+            "duration": time.time() - self._start,
+            "stalls": {
+                "count": count,
+                "total": sum(stalls),
+                "max": stalls[-1] if count else None,
+                "p95": stalls[int(count * 0.95)] if count else None,
+            },
+            "slots": {name: {"calls": len(durations),
+                             "total": sum(durations),
+                             "max": max(durations)}
+                      for name, durations in slots.items()},
+        }
+
+    def to_trace(self):
+        with self._lock:
+            events = list(self.events)
+
+        return {"traceEvents": events,
+                "displayTimeUnit": "ms",
+                "otherData": self.summary()}
+
+    def dump(self, path=None):
+        """Write the trace as JSON"""
+
+        path = path or self.output
+        if not path:
+            return
+
+        with open(path, "w") as f:
+            json.dump(self.to_trace(), f)
+
+        log.info("Wrote UI profile to %s" % path)
+
+
+def enable(output=None):
+    """Start profiling the user interface
+
+    Wraps the slots in SLOTS and, when a QApplication exists, starts
+    watching the event loop. Has no effect when already enabled.
+
+    Args:
+        output(str, optional): path the trace is written to on exit
+
+    Returns:
+        Profiler
+
+    """
+
+    if self._profiler is not None:
+        return self._profiler
+
+    profiler = Profiler(output)
+    profiler.wrap_slots()
+
+    from avalon.vendor.Qt import QtCore
+    if QtCore.QCoreApplication.instance() is not None:
+        profiler.start_heartbeat()
+
+    atexit.register(profiler.dump)
+
+    self._profiler = profiler
+
+    return profiler
+
+
+def disable():
+    """Stop profiling and restore the original slots"""
+
+    profiler = self._profiler
+    if profiler is None:
+        return
+
+    profiler.stop_heartbeat()
+    profiler.unwrap_slots()
+    atexit.unregister(profiler.dump)
+
+    self._profiler = None
+
+
+def get_profiler():
+    """Return the active profiler, None when profiling is not enabled"""
+    return self._profiler
+
+
+def run(duration=10.0, output=None, cycle=False):
+    """Show the window for a while and return the profile summary
+
+    Args:
+        duration(float): seconds the window is shown
+        output(str, optional): path of the trace
+        cycle(bool): select every project in turn, one per second
+
+    Returns:
+        dict
+
+    """
+
+    from avalon.vendor.Qt import QtWidgets, QtCore
+
+    application = QtWidgets.QApplication.instance() or \
+        QtWidgets.QApplication(sys.argv)
+
+    profiler = enable(output)
+
+    from cbprojectmanager import app
+
+    window = app.Window()
+    window.show()
+
+    if cycle:
+        def select_next():
+            combobox = window._projects
+            if combobox.isEnabled() and combobox.count() > 1:
+                index = combobox.currentIndex() + 1
+                combobox.setCurrentIndex(max(index % combobox.count(), 1))
+
+        timer = QtCore.QTimer()
+        timer.setInterval(1000)
+        timer.timeout.connect(select_next)
+        timer.start()
+
+    QtCore.QTimer.singleShot(int(duration * 1000), application.quit)
+    application.exec_()
+
+    window.stop_watcher()
+    profiler.dump()
+
+    summary = profiler.summary()
+    disable()
+
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cbprojectmanager.profiler")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="Seconds the window is shown")
+    parser.add_argument("--output", default="trace.json",
+                        help="Path of the Chrome trace")
+    parser.add_argument("--cycle", action="store_true",
+                        help="Select every project in turn")
+    parser.add_argument("--max-stall", type=float,
+                        help="Fail when the longest stall in seconds is "
+                             "higher")
+
+    args = parser.parse_args(argv)
+
+    # Headless unless a platform is given
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    summary = run(args.duration, args.output, args.cycle)
+    print(json.dumps(summary, indent=4))
+
+    longest = summary["stalls"]["max"] or 0.0
+    if args.max_stall is not None and longest > args.max_stall:
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
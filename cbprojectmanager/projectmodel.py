@@ -0,0 +1,142 @@
+"""Models of the project dropdown menu
+
+Only Qt is imported here, the window creates these models on start up while
+the other models are imported on first use.
+"""
+
+import bisect
+
+from avalon.vendor.Qt import QtCore
+
+
+class ProjectModel(QtCore.QAbstractListModel):
+    """Sorted list of project names with a `<None>` placeholder as first row
+
+    `set_projects` compares the new projects with the current ones and only
+    emits the row insertions and removals which are needed, views keep their
+    selection and scroll position over a refresh.
+    """
+
+    IdRole = QtCore.Qt.UserRole + 1
+
+    placeholder = "<None>"
+
+    def __init__(self, parent=None):
+        super(ProjectModel, self).__init__(parent)
+
+        # Sorted list of (name, id)
+        self._items = []
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._items) + 1
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+
+        if not index.isValid():
+            return
+
+        row = index.row()
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            if row == 0:
+                return self.placeholder
+            return self._items[row - 1][0]
+
+        if role == self.IdRole and row > 0:
+            return self._items[row - 1][1]
+
+    def names(self):
+        return [name for name, _ in self._items]
+
+    def find(self, name):
+        """Return the row of the project, -1 when not found"""
+
+        names = self.names()
+        row = bisect.bisect_left(names, name)
+        if row < len(names) and names[row] == name:
+            return row + 1
+        return -1
+
+    def set_projects(self, projects):
+        """Update the model to the given projects
+
+        Args:
+            projects(dict): project name and id pairs
+
+        """
+
+        new = sorted(projects.items())
+        new_names = set(projects)
+
+        # Remove the rows which are gone, last range first to keep the
+        # row numbers of the other ranges valid
+        rows = [i for i, (name, _) in enumerate(self._items)
+                if name not in new_names]
+        for first, last in reversed(_ranges(rows)):
+            self.beginRemoveRows(QtCore.QModelIndex(), first + 1, last + 1)
+            del self._items[first:last + 1]
+            self.endRemoveRows()
+
+        # The remaining items are a sorted subset of the new items, walk
+        # both and insert each run of new items at once
+        i = 0
+        row = 0
+        while row < len(new):
+            if i < len(self._items) and self._items[i][0] == new[row][0]:
+                if self._items[i][1] != new[row][1]:
+                    self._items[i] = new[row]
+                    index = self.index(i + 1, 0)
+                    self.dataChanged.emit(index, index)
+                i += 1
+                row += 1
+                continue
+
+            start = row
+            while row < len(new) and not (i < len(self._items) and
+                                          self._items[i][0] == new[row][0]):
+                row += 1
+
+            run = new[start:row]
+            self.beginInsertRows(QtCore.QModelIndex(), i + 1, i + len(run))
+            self._items[i:i] = run
+            self.endInsertRows()
+            i += len(run)
+
+    def add_project(self, name, _id):
+        projects = dict(self._items)
+        projects[name] = _id
+        self.set_projects(projects)
+
+    def remove_project(self, name):
+        projects = dict(self._items)
+        projects.pop(name, None)
+        self.set_projects(projects)
+
+
+class ProjectFilterModel(QtCore.QSortFilterProxyModel):
+    """Case insensitive filter on the project names, for type-ahead search
+
+    The `<None>` placeholder is never shown.
+    """
+
+    def __init__(self, parent=None):
+        super(ProjectFilterModel, self).__init__(parent)
+        self.setFilterCaseSensitivity(QtCore.Qt.CaseInsensitive)
+
+    def filterAcceptsRow(self, row, parent):
+        if row == 0:
+            return False
+        return super(ProjectFilterModel, self).filterAcceptsRow(row, parent)
+
+
+def _ranges(rows):
+    """Group sorted row numbers in (first, last) ranges of adjacent rows"""
+
+    ranges = []
+    for row in rows:
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1] = (ranges[-1][0], row)
+        else:
+            ranges.append((row, row))
+    return ranges
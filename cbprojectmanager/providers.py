@@ -0,0 +1,202 @@
+"""Data providers of the overview
+
+Every tile in the overview is filled by a provider. A provider is a class
+with the following attributes:
+    - label (str): header of the tile
+    - order (int): position of the tile
+    - process (method): takes the project name and returns a dictionary of
+      label and value pairs
+
+Providers run in the background, their results are cached per project
+until the cache entry expires or the project is changed through `lib`.
+
+Example:
+    >>> class Frames(object):
+    ...     label = "frames"
+    ...     order = 10
+    ...     def process(self, name):
+    ...         return {"total": count_frames(name)}
+    >>> register_provider(Frames)
+
+"""
+
+import sys
+import logging
+
+from cbprojectmanager import lib
+from cbprojectmanager.cache import Cache
+
+log = logging.getLogger(__name__)
+
+# Amount of seconds the results of a provider are reused
+CACHE_TTL = 300
+CACHE_SIZE = 1024
+
+self = sys.modules[__name__]
+self._providers = {}
+self._cache = Cache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+
+NOT_AVAILABLE = "N/A"
+
+
+class GeneralProvider(object):
+    """Name and format of the project"""
+
+    label = "general"
+    order = 0
+
+    def process(self, name):
+        project = lib.get_project(name, projection=["name", "data"])
+        data = project.get("data", {})
+
+        return {"name": project["name"],
+                "type": data.get("type", NOT_AVAILABLE),
+                "fps": data.get("fps", NOT_AVAILABLE),
+                "resolution": data.get("resolution", NOT_AVAILABLE)}
+
+
+class DatesProvider(object):
+    """Start and end date of the project"""
+
+    label = "dates"
+    order = 1
+
+    def process(self, name):
+        project = lib.get_project(name, projection=["data"])
+        data = project.get("data", {})
+
+        return {"Start": data.get("startdate", NOT_AVAILABLE),
+                "End": data.get("enddate", NOT_AVAILABLE)}
+
+
+class AssetsProvider(object):
+    """Amount of assets per silo"""
+
+    label = "assets"
+    order = 2
+
+    def process(self, name):
+        statistics = lib.get_project_statistics(name)
+
+        result = dict(statistics["silos"])
+        result["total"] = statistics["assets"]
+
+        return result
+
+
+class TasksProvider(object):
+    """Amount of configured tasks and applications"""
+
+    label = "tasks"
+    order = 3
+
+    def process(self, name):
+        project = lib.get_project(name, projection=["config"])
+        config = project.get("config", {})
+
+        return {"tasks": len(config.get("tasks", [])),
+                "apps": len(config.get("apps", []))}
+
+
+class ActivityProvider(object):
+    """Time the last document was added to the project"""
+
+    label = "activity"
+    order = 4
+
+    def process(self, name):
+        last = lib.get_last_modified(name)
+        if last is None:
+            return {"Last modified": NOT_AVAILABLE}
+
+        return {"Last modified": last.strftime("%Y-%m-%d %H:%M")}
+
+
+class DiskUsageProvider(object):
+    """Disk usage of the project, not implemented yet"""
+
+    label = "disk usage"
+    order = 5
+
+    def process(self, name):
+        return {"Used": NOT_AVAILABLE}
+
+
+def register_provider(provider):
+    """Register a provider class, replacing one with the same label"""
+
+    for attr in ("label", "order", "process"):
+        assert hasattr(provider, attr), ("%s is missing attribute `%s`"
+                                         % (provider.__name__, attr))
+
+    self._providers[provider.label] = provider
+
+
+def deregister_provider(provider):
+    if self._providers.get(provider.label) is provider:
+        self._providers.pop(provider.label)
+        invalidate(label=provider.label)
+
+
+def get_providers():
+    """Return the registered provider classes sorted by order"""
+    return sorted(self._providers.values(), key=lambda p: p.order)
+
+
+def get_cached(provider, name):
+    """Return the cached result of a provider, None when not cached"""
+    return self._cache.get((provider.label, name))
+
+
+def process(provider, name, use_cache=True):
+    """Run a provider for a project
+
+    Args:
+        provider(class): registered provider class
+        name(str): name of the project
+        use_cache(bool): return the cached result when available
+
+    Returns:
+        dict
+
+    """
+
+    cache = self._cache
+    key = (provider.label, name)
+
+    if use_cache:
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+    result = provider().process(name)
+    cache.set(key, result)
+
+    return result
+
+
+def invalidate(name=None, label=None):
+    """Remove cached results of a project, a provider or all results"""
+
+    if name is None and label is None:
+        self._cache.invalidate()
+        return
+
+    self._cache.invalidate(lambda key: (label is None or key[0] == label)
+                           and (name is None or key[1] == name))
+
+
+def _on_invalidate(name):
+    invalidate(name=name)
+
+
+# Drop the results of a project when it is changed through lib
+lib.register_invalidate_callback(_on_invalidate)
+
+for _provider in (GeneralProvider,
+                  DatesProvider,
+                  AssetsProvider,
+                  TasksProvider,
+                  ActivityProvider,
+                  DiskUsageProvider):
+    register_provider(_provider)
@@ -0,0 +1,166 @@
+"""Validate the documents of existing projects against the avalon schemas
+
+Documents are streamed from the database in raw BSON batches and validated
+in a pool of processes, each process compiles the validators once. Only a
+limited amount of batches is in flight at any time, memory use does not
+depend on the size of the projects.
+
+Failures are written as JSON lines, one failure per line.
+
+Example:
+    >>> summary = validate_projects(["MyProject"], report="failures.jsonl")
+    >>> summary["failed"]
+    0
+
+"""
+
+import json
+import time
+import logging
+import multiprocessing
+from concurrent import futures
+
+import bson
+
+from cbprojectmanager import lib
+
+log = logging.getLogger(__name__)
+
+# Documents per batch sent to a process
+BATCH_SIZE = 1000
+
+# Seconds between progress messages
+PROGRESS_INTERVAL = 5.0
+
+
+def validate_projects(projects=None, report=None, processes=None,
+                      batch_size=None, progress=None):
+    """Validate all documents of one or more projects
+
+    Args:
+        projects(list, optional): names of the projects, all projects when
+            not given
+        report(str, optional): path of the JSON lines file the failures
+            are written to
+        processes(int, optional): amount of processes, defaults to the
+            amount of cores
+        batch_size(int, optional): documents per batch, see BATCH_SIZE
+        progress(callable, optional): called with the summary every
+            PROGRESS_INTERVAL seconds
+
+    Returns:
+        dict: summary with the keys `projects`, `documents`, `failed`,
+            `duration` and `rate` (documents per second)
+
+    """
+
+    if projects is None:
+        projects = [p["name"] for p in lib.get_projects(projection=["name"])]
+
+    batch_size = batch_size or BATCH_SIZE
+    processes = processes or multiprocessing.cpu_count()
+
+    summary = {"projects": len(projects),
+               "documents": 0,
+               "failed": 0,
+               "duration": 0.0,
+               "rate": 0.0}
+
+    output = open(report, "w") if report else None
+
+    t1 = time.time()
+    last = [t1]
+
+    def collect(future):
+        documents, failures = future.result()
+        summary["documents"] += documents
+        summary["failed"] += len(failures)
+
+        if output is not None:
+            for failure in failures:
+                output.write(json.dumps(failure, default=str) + "\n")
+
+        now = time.time()
+        summary["duration"] = now - t1
+        summary["rate"] = summary["documents"] / max(now - t1, 1e-6)
+
+        if progress is not None and now - last[0] > PROGRESS_INTERVAL:
+            last[0] = now
+            progress(dict(summary))
+
+    try:
+        with futures.ProcessPoolExecutor(max_workers=processes,
+                                         initializer=_initialize) as pool:
+
+            # Keep a few batches per process queued, not the whole project
+            max_pending = 2 * processes
+            pending = set()
+
+            for project in projects:
+                batches = lib.iter_raw_batches(project, batch_size=batch_size)
+                for data in batches:
+                    if len(pending) >= max_pending:
+                        done, pending = futures.wait(
+                            pending, return_when=futures.FIRST_COMPLETED)
+                        for future in done:
+                            collect(future)
+
+                    pending.add(pool.submit(_validate_batch, project, data))
+
+            for future in futures.as_completed(pending):
+                collect(future)
+
+    finally:
+        if output is not None:
+            output.close()
+
+    summary["duration"] = time.time() - t1
+    summary["rate"] = summary["documents"] / max(summary["duration"], 1e-6)
+
+    log.info("Validated %(documents)i documents of %(projects)i projects, "
+             "%(failed)i failed (%(rate).0f documents/s)" % summary)
+
+    return summary
+
+
+def _initialize():
+    """Compile the validators of all avalon schemas in a new process"""
+
+    from avalon import schema
+
+    for name in list(schema._cache):
+        if name.endswith(".json") and not name.startswith("_"):
+            lib._get_validator(name)
+
+
+def _validate_batch(project, data):
+    """Validate a batch of BSON encoded documents
+
+    Returns:
+        tuple: amount of documents and a list of failures
+
+    """
+
+    documents = bson.decode_all(data)
+
+    failures = []
+    for document in documents:
+        try:
+            if "schema" not in document:
+                raise ValueError("Document has no schema")
+            lib.validate(document)
+        except Exception as exception:
+            failures.append({
+                "project": project,
+                "_id": str(document.get("_id")),
+                "type": document.get("type"),
+                "name": document.get("name"),
+                "schema": document.get("schema"),
+                "path": "/".join(str(key) for key in
+                                 getattr(exception, "path", [])),
+                "error": getattr(exception, "message", None) or
+                str(exception),
+            })
+
+    return len(documents), failures
+
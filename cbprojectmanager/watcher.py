@@ -0,0 +1,232 @@
+"""Watch the database for projects being added, removed or updated
+
+The watcher subscribes to the change stream of the database. Change streams
+are only available on replica sets, when the server (or a stand-in like
+mongomock) does not support them the watcher falls back to polling. Each
+poll fetches the project documents in batches and compares a hash of every
+document with the previous poll.
+
+Example:
+    >>> def on_event(event, name, document):
+    ...     print(event, name)
+    >>> watcher = ProjectWatcher(on_event)
+    >>> watcher.start()
+
+"""
+
+import hashlib
+import logging
+import threading
+
+import bson
+import pymongo
+
+from cbprojectmanager import lib
+
+log = logging.getLogger(__name__)
+
+ADDED = "added"
+REMOVED = "removed"
+UPDATED = "updated"
+
+
+class ProjectWatcher(object):
+    """Report project changes in the current database
+
+    The callback is called from the watcher thread with the event type
+    (`added`, `removed` or `updated`), the name of the project and the
+    project document. The document is None for removed projects.
+
+    Args:
+        callback(callable): function called for each event
+        interval(float): seconds between polls when change streams are not
+            supported
+        use_change_stream(bool): try to subscribe to the change stream before
+            falling back to polling
+
+    """
+
+    def __init__(self, callback, interval=5.0, use_change_stream=True):
+        self.callback = callback
+        self.interval = interval
+        self.use_change_stream = use_change_stream
+
+        # Collection name -> (project name, project id, marker)
+        self._projects = {}
+
+        self._resume_token = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start watching in a background thread"""
+
+        if self.running:
+            return
+
+        self._stop.clear()
+
+        self._thread = threading.Thread(target=self._run,
+                                        name="ProjectWatcher")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def poll(self, emit=True):
+        """Compare the projects in the database with the last snapshot
+
+        Args:
+            emit(bool): call the callback for the found differences
+
+        Returns:
+            list of tuple(str, str, dict): the found events
+
+        """
+
+        names = [name for name in lib._database.collection_names()
+                 if name not in ("system.indexes",)]
+
+        current = {}
+        documents = {}
+        for collection, document in lib.iter_projects(names=names):
+            current[collection] = (document["name"],
+                                   document["_id"],
+                                   _marker(document))
+            documents[collection] = document
+
+        events = []
+        for collection, (name, _id, marker) in self._projects.items():
+            if collection not in current:
+                events.append((REMOVED, name, None))
+
+        for collection, (name, _id, marker) in current.items():
+            previous = self._projects.get(collection)
+            if previous is None:
+                events.append((ADDED, name, documents[collection]))
+            elif previous[0] != name:
+                events.append((REMOVED, previous[0], None))
+                events.append((ADDED, name, documents[collection]))
+            elif previous[2] != marker:
+                events.append((UPDATED, name, documents[collection]))
+
+        self._projects = current
+
+        if emit:
+            for event in events:
+                self._emit(*event)
+
+        return events
+
+    def _run(self):
+        # Take a snapshot of the current projects to compare against
+        try:
+            self.poll(emit=False)
+        except Exception:
+            log.exception("Could not list the projects")
+
+        if self.use_change_stream:
+            try:
+                self._watch()
+            except (pymongo.errors.OperationFailure,
+                    pymongo.errors.ConfigurationError,
+                    NotImplementedError) as exception:
+                log.info("Change streams not available, polling every "
+                         "%.1f s: %s" % (self.interval, exception))
+            except Exception:
+                log.exception("Change stream closed, polling in stead")
+
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                log.exception("Could not poll the database for changes")
+
+    def _watch(self):
+        """Process change stream events until the watcher is stopped"""
+
+        # Stand-ins like mongomock return a collection for unknown attributes
+        if not hasattr(type(lib._database), "watch"):
+            raise NotImplementedError("Database does not support `watch`")
+
+        pipeline = [{"$match": {"$or": [
+            {"operationType": {"$in": ["delete",
+                                       "drop",
+                                       "rename",
+                                       "dropDatabase",
+                                       "invalidate"]}},
+            {"fullDocument.type": "project"}
+        ]}}]
+
+        while not self._stop.is_set():
+            with lib._database.watch(pipeline,
+                                     full_document="updateLookup",
+                                     resume_after=self._resume_token,
+                                     max_await_time_ms=1000) as stream:
+                while stream.alive and not self._stop.is_set():
+                    change = stream.try_next()
+                    self._resume_token = stream.resume_token
+                    if change is not None:
+                        self._on_change(change)
+
+    def _on_change(self, change):
+        operation = change["operationType"]
+        collection = change.get("ns", {}).get("coll")
+
+        if operation in ("dropDatabase", "invalidate", "rename"):
+            # Resynchronize from scratch, a new stream is opened afterwards
+            self._resume_token = None
+            self.poll()
+            return
+
+        known = self._projects.get(collection)
+
+        if operation == "drop":
+            if known is not None:
+                self._projects.pop(collection)
+                self._emit(REMOVED, known[0], None)
+
+        elif operation == "delete":
+            _id = change.get("documentKey", {}).get("_id")
+            if known is not None and known[1] == _id:
+                self._projects.pop(collection)
+                self._emit(REMOVED, known[0], None)
+
+        else:
+            document = change.get("fullDocument")
+            if not document or document.get("type") != "project":
+                return
+
+            name = document["name"]
+            self._projects[collection] = (name,
+                                          document["_id"],
+                                          _marker(document))
+            if known is None:
+                self._emit(ADDED, name, document)
+            elif known[0] != name:
+                self._emit(REMOVED, known[0], None)
+                self._emit(ADDED, name, document)
+            else:
+                self._emit(UPDATED, name, document)
+
+    def _emit(self, event, name, document):
+        if event != UPDATED:
+            lib.invalidate_project_index()
+        lib.invalidate_cache(name)
+        try:
+            self.callback(event, name, document)
+        except Exception:
+            log.exception("Error in project watcher callback")
+
+
+def _marker(document):
+    """Return a cheap version marker of a document"""
+    return hashlib.md5(bson.BSON.encode(document)).hexdigest()
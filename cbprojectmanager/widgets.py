@@ -1,13 +1,13 @@
-import os
-import json
 import logging
 from functools import partial
 
 from avalon.vendor.Qt import QtWidgets, QtCore
-from avalon.vendor import qtawesome as qta
 
-from cbprojectmanager.model import TreeModel, Node
-from cbprojectmanager import lib, style
+from cbprojectmanager import icons, style
+from cbprojectmanager.worker import get_executor
+
+# The database library (pymongo, bson), qtawesome and the models are
+# imported on first use to keep the start up of the application fast
 
 
 class CreateProjectWidget(QtWidgets.QWidget):
@@ -126,15 +126,20 @@ class CreateProjectWidget(QtWidgets.QWidget):
         project_name = self.project_name.text()
         assert project_name, "Name cannot be empty!"
 
+        clone_from = None
         if self.clone_toggle.isChecked():
             clone_from = self.clone_project.currentText()
-            template = lib.get_project_template(clone_from)
-        else:
-            template = lib.get_template()
 
         print("Creating project named %s" % project_name)
 
-        result = lib.create_project(project_name, template)
+        self.create.setEnabled(False)
+        get_executor().submit(_create_project,
+                              args=(project_name, clone_from),
+                              callback=partial(self._on_created, project_name),
+                              error=self._on_create_failed)
+
+    def _on_created(self, project_name, result):
+        self.create.setEnabled(True)
         if not result:
             print("Error occurred in creating project")
             return
@@ -144,6 +149,24 @@ class CreateProjectWidget(QtWidgets.QWidget):
 
         self.close()
 
+    def _on_create_failed(self, exception):
+        self.create.setEnabled(True)
+        print("Error occurred in creating project")
+        print(exception)
+
+
+def _create_project(name, clone_from=None):
+    """Create a project from the base template or an existing project"""
+
+    from cbprojectmanager import lib
+
+    if clone_from:
+        template = lib.get_project_template(clone_from)
+    else:
+        template = lib.get_template()
+
+    return lib.create_project(name, template)
+
 
 class ManageProjectWidget(QtWidgets.QWidget):
     """Widget to manage the current set project
@@ -255,6 +278,9 @@ class OverviewWidget(QtWidgets.QWidget):
     order = 0
     label = "Overview"
 
+    # Shown in the blocks while their data is loaded
+    loading_text = "..."
+
     def __init__(self, parent=None):
         QtWidgets.QWidget.__init__(self, parent)
 
@@ -265,6 +291,7 @@ class OverviewWidget(QtWidgets.QWidget):
 
         layout = QtWidgets.QVBoxLayout()
         layout.setSpacing(5)
+        layout.addStretch()
 
         self.layout = layout
 
@@ -278,94 +305,157 @@ class OverviewWidget(QtWidgets.QWidget):
             print("Cannot add similar header, please use `update` in stead")
             return
 
-        data_widget = QtWidgets.QWidget()
+        data_widget = OverviewTile(header, data)
         data_widget.setFixedHeight(self._tile_height)
 
-        layout = QtWidgets.QVBoxLayout()
-
-        title = QtWidgets.QLabel(header.upper())
-        title.setStyleSheet(style.overview_tile_title)
-
-        formlayout = QtWidgets.QFormLayout()
-        for label, value in data.items():
-            value_label = QtWidgets.QLabel(value)
-            formlayout.addRow("%s :" % label, value_label)
-
-        layout.addWidget(title)
-        layout.addLayout(formlayout)
-        layout.addStretch()
-
-        data_widget.setLayout(layout)
-
         self.data_table[header] = {"widget": data_widget, "data": data}
 
-        position = self.layout.count() + 1
+        # Insert before the stretch at the end of the layout
+        position = self.layout.count() - 1
 
         self.layout.insertWidget(position, data_widget)
 
     def update_data(self, header, data):
+        """Update the values of an existing block in place"""
 
-        self.layout.blockSignals(True)
+        self.data_table[header]["widget"].set_data(data)
+        self.data_table[header]["data"] = data
 
-        widget = self.data_table[header]["widget"]
-        self.layout.removeWidget(widget)
-        self.data_table.pop(header, None)
+        return True
 
-        self.add_data(header, data)
+    def remove_data(self, header):
+        """Remove a block and release its widgets"""
 
-        self.layout.blockSignals(False)
+        item = self.data_table.pop(header, None)
+        if item is None:
+            return
 
-        return True
+        widget = item["widget"]
+        self.layout.removeWidget(widget)
+        widget.deleteLater()
 
     def refresh(self, name):
         print("Loading overview of: %s" % name)
 
-        size = self.size()
-        self.resize(0, 0)
+        from cbprojectmanager import providers
+
+        # Every provider fills its own tile as soon as its result is in,
+        # cached results are shown immediately. Only the last selected
+        # project is of interest, earlier requests are cancelled by using
+        # the same key per provider.
+        executor = get_executor()
+        for provider in providers.get_providers():
+            key = "overview.%s" % provider.label
+
+            # Create the tiles in the order of the providers
+            if provider.label not in self.data_table:
+                self.add_data(provider.label, {})
+
+            cached = providers.get_cached(provider, name)
+            if cached is not None:
+                executor.cancel(key)
+                self.set_data({provider.label: cached})
+                continue
+
+            # Do not show the values of the previous project meanwhile
+            self.set_data({provider.label: self._placeholder(
+                provider.label, self.loading_text)})
+
+            executor.submit(providers.process,
+                            args=(provider, name),
+                            callback=partial(self._on_provided,
+                                             provider.label),
+                            error=partial(self._on_provide_failed,
+                                          provider.label, name),
+                            key=key)
+
+    def _on_provided(self, header, data):
+        self.set_data({header: data})
+
+    def _on_provide_failed(self, header, name, exception):
+        from cbprojectmanager import providers
+
+        print("Could not load `%s` of %s: %s" % (header, name, exception))
+        self.set_data({header: self._placeholder(header,
+                                                 providers.NOT_AVAILABLE)})
+
+    def _placeholder(self, header, value):
+        """Return the data of a block with every value set to `value`"""
+
+        keys = self.data_table[header]["data"] or ["status"]
+        return {key: value for key in keys}
+
+    def set_data(self, general_data):
+        """Add or update the data blocks in the overview
+
+        Args:
+            general_data(dict): data per header
 
-        # Remove stretch
-        stretch_idx = self.layout.count() - 1
-        self.layout.takeAt(stretch_idx)
+        """
 
         # Start adding or updating data blocks
-        general_data = self.fetch_general_data(name)
         for header, data in general_data.items():
             if header in self.data_table:
                 self.update_data(header, data)
             else:
                 self.add_data(header, data)
 
-        # Add stretch again
-        self.layout.addStretch()
 
-        self.resize(size)
+class OverviewTile(QtWidgets.QWidget):
+    """Information block of the overview with a title and labeled values
+
+    Updating the block changes the text of the existing labels, rows are
+    only added or removed when the keys of the data change.
+    """
 
-    def fetch_general_data(self, name):
-        """Get the general data of a project
+    def __init__(self, header, data=None, parent=None):
+        QtWidgets.QWidget.__init__(self, parent)
+
+        layout = QtWidgets.QVBoxLayout()
+
+        title = QtWidgets.QLabel(header.upper())
+        title.setStyleSheet(style.overview_tile_title)
+
+        formlayout = QtWidgets.QFormLayout()
+
+        layout.addWidget(title)
+        layout.addLayout(formlayout)
+        layout.addStretch()
+
+        self.setLayout(layout)
+
+        self.header = header
+
+        self._formlayout = formlayout
+        self._labels = {}
+
+        self.set_data(data or {})
+
+    def set_data(self, data):
+        """Show the given data
 
         Args:
-            name(str): name of the project
+            data(dict): label and value pairs
 
-        Returns:
-            dict
         """
 
-        n_a = "N/A"
-        project = lib.get_project(name)
+        if set(data) != set(self._labels):
+            # Remove the rows of keys which are gone, this deletes the
+            # widgets of the row as well
+            for key in [k for k in self._labels if k not in data]:
+                self._formlayout.removeRow(self._labels.pop(key))
 
-        data = {
-            "general": {"name": project["name"],
-                        "type": project["data"].get("type", n_a),
-                        "fps": project["data"].get("fps", n_a),
-                        "resolution": project["data"].get("resolution", n_a),
-                        },
-            "dates": {
-                "Start": project["data"].get("startdate", n_a),
-                "End": project["data"].get("enddate", n_a)
-            }
-        }
+            for key in data:
+                if key not in self._labels:
+                    value_label = QtWidgets.QLabel()
+                    self._formlayout.addRow("%s :" % key, value_label)
+                    self._labels[key] = value_label
 
-        return data
+        for key, value in data.items():
+            text = str(value)
+            value_label = self._labels[key]
+            if value_label.text() != text:
+                value_label.setText(text)
 
 
 class TaskWidget(QtWidgets.QWidget):
@@ -389,6 +479,8 @@ class TaskWidget(QtWidgets.QWidget):
         top_layout.addWidget(add_button)
         top_layout.addWidget(remove_button)
 
+        from cbprojectmanager.model import TreeModel
+
         tree_view = QtWidgets.QTreeView()
         tree_model = TreeModel()
         tree_view.setModel(tree_model)
@@ -417,6 +509,8 @@ class TaskWidget(QtWidgets.QWidget):
 
     def update_task_view(self, dict):
 
+        from cbprojectmanager.model import Node
+
         node = Node()
         node.update(dict)
 
@@ -466,6 +560,7 @@ class AddTaskIconDialog(QtWidgets.QWidget):
         self.icon_preview = icon_preview_button
 
         self.fontlib = {}
+        self._icon_model = None
 
         self.connect_signals()
 
@@ -477,21 +572,32 @@ class AddTaskIconDialog(QtWidgets.QWidget):
         self._populate_icons()
 
     def _install_fontlib(self):
+        # The charmap is parsed once per process
+        self.fontlib = icons.get_charmap()
+
+    def _populate_icons(self):
+        if self.icon_name.model() is self._icon_model:
+            return
 
-        # TODO: fix qta thingy
-        package = os.path.dirname(qta.__file__)
-        fonts = os.path.join(package, "fonts",
-                             "fontawesome-webfont-charmap.json")
+        self._icon_model = icons.IconModel(color=style.colors.dark,
+                                           parent=self)
 
-        with open(fonts, "r") as f:
-            font_lib = json.load(f)
+        # Search icons by typing part of the name
+        icon_filter = QtCore.QSortFilterProxyModel(self)
+        icon_filter.setFilterCaseSensitivity(QtCore.Qt.CaseInsensitive)
+        icon_filter.setSourceModel(self._icon_model)
 
-        self.fontlib = font_lib
+        completer = QtWidgets.QCompleter(icon_filter, self.icon_name)
+        completer.setCompletionMode(
+            QtWidgets.QCompleter.UnfilteredPopupCompletion)
 
-    def _populate_icons(self):
         self.icon_name.blockSignals(True)
-        icons = [""] + list(self.fontlib.keys())
-        self.icon_name.addItems(icons)
+        self.icon_name.setModel(self._icon_model)
+        self.icon_name.setEditable(True)
+        self.icon_name.setInsertPolicy(QtWidgets.QComboBox.NoInsert)
+        self.icon_name.setCompleter(completer)
+        self.icon_name.lineEdit().textEdited.connect(
+            icon_filter.setFilterFixedString)
         self.icon_name.blockSignals(False)
 
     def connect_signals(self):
@@ -507,11 +613,115 @@ class AddTaskIconDialog(QtWidgets.QWidget):
 
     def _create_preview(self):
 
-        icon_name = "fa.{}".format(self.icon_name.currentText())
-        new_icon = qta.icon(icon_name, color=style.colors.dark)
+        new_icon = icons.get_icon(self.icon_name.currentText(),
+                                  color=style.colors.dark)
         self.icon_preview.setIcon(new_icon)
 
 
+class DebugPanel(QtWidgets.QWidget):
+    """Latency, round trips and bytes of the instrumented database calls
+
+    The metrics of `cbprojectmanager.instrument` are refreshed every second
+    while the panel is visible.
+    """
+
+    columns = ["Name", "Calls", "Errors", "Mean ms", "p95 ms", "Max ms",
+               "Round trips", "KB sent", "KB received"]
+
+    def __init__(self, parent=None):
+        QtWidgets.QWidget.__init__(self, parent=parent)
+
+        self.setWindowTitle("Project Manager - Database calls")
+        self.setWindowFlags(QtCore.Qt.Tool)
+        self.resize(800, 500)
+
+        layout = QtWidgets.QVBoxLayout()
+
+        view = QtWidgets.QTreeWidget()
+        view.setColumnCount(len(self.columns))
+        view.setHeaderLabels(self.columns)
+        view.setRootIsDecorated(True)
+        view.setSortingEnabled(True)
+        view.sortByColumn(3, QtCore.Qt.DescendingOrder)
+
+        slow_label = QtWidgets.QLabel()
+
+        reset_button = QtWidgets.QPushButton("Reset")
+        reset_button.setStyleSheet(style.flat_button)
+
+        footer_layout = QtWidgets.QHBoxLayout()
+        footer_layout.addWidget(slow_label)
+        footer_layout.addStretch()
+        footer_layout.addWidget(reset_button)
+
+        layout.addWidget(view)
+        layout.addLayout(footer_layout)
+
+        self.setLayout(layout)
+
+        timer = QtCore.QTimer(self)
+        timer.setInterval(1000)
+
+        self.view = view
+        self.slow_label = slow_label
+        self.timer = timer
+
+        timer.timeout.connect(self.refresh)
+        reset_button.clicked.connect(self.on_reset)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start()
+        QtWidgets.QWidget.showEvent(self, event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        QtWidgets.QWidget.hideEvent(self, event)
+
+    def refresh(self):
+        from cbprojectmanager import instrument
+
+        stats = instrument.get_stats()
+
+        self.view.setSortingEnabled(False)
+        self.view.clear()
+        for group in ("functions", "commands"):
+            parent = QtWidgets.QTreeWidgetItem(self.view, [group])
+            parent.setFirstColumnSpanned(True)
+            for name, metrics in stats[group].items():
+                QtWidgets.QTreeWidgetItem(parent, self._format(name, metrics))
+            parent.setExpanded(True)
+        self.view.setSortingEnabled(True)
+
+        for column in range(len(self.columns)):
+            self.view.resizeColumnToContents(column)
+
+        self.slow_label.setText("Slow operations (> %.0f ms): %i"
+                                % (stats["slow_threshold"] * 1000,
+                                   len(stats["slow"])))
+
+    def on_reset(self):
+        from cbprojectmanager import instrument
+
+        instrument.reset()
+        self.refresh()
+
+    def _format(self, name, metrics):
+
+        def milliseconds(value):
+            return "%.2f" % (value * 1000) if value is not None else "-"
+
+        return [name,
+                str(metrics["count"]),
+                str(metrics["errors"]),
+                milliseconds(metrics["mean"]),
+                milliseconds(metrics["p95"]),
+                milliseconds(metrics["max"]),
+                str(metrics["round_trips"]),
+                "%.1f" % (metrics["bytes_sent"] / 1024.0),
+                "%.1f" % (metrics["bytes_received"] / 1024.0)]
+
+
 class Navigation(QtWidgets.QWidget):
     """Navigation panel widget"""
 
@@ -0,0 +1,171 @@
+"""Run database calls off the GUI thread
+
+Functions are executed on a `QThreadPool`, their result is delivered to the
+callback in the thread the executor lives in (the GUI thread). Requests can
+be given a key, when a new request with the same key is submitted the
+previous one is cancelled. A cancelled request which did not start yet is
+skipped, the result of one already running is discarded.
+
+Example:
+    >>> executor = get_executor()
+    >>> executor.submit(lib.get_project, args=("MyProject",),
+    ...                 callback=widget.set_project, key="overview")
+
+"""
+
+import sys
+import logging
+import itertools
+import threading
+
+from avalon.vendor.Qt import QtCore
+
+log = logging.getLogger(__name__)
+
+self = sys.modules[__name__]
+self._executor = None
+
+
+class Request(object):
+    """Handle of a submitted function call"""
+
+    _counter = itertools.count()
+
+    def __init__(self, func, args, kwargs, callback, error, key):
+        self.id = next(self._counter)
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.callback = callback
+        self.error = error
+        self.key = key
+
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+
+class _Runnable(QtCore.QRunnable):
+
+    def __init__(self, request, done):
+        QtCore.QRunnable.__init__(self)
+        self.request = request
+        self.done = done
+
+    def run(self):
+        request = self.request
+        if request.cancelled:
+            self.done.emit(request, None, None)
+            return
+
+        try:
+            result = request.func(*request.args, **request.kwargs)
+        except Exception as exception:
+            log.debug("Request failed", exc_info=True)
+            self.done.emit(request, None, exception)
+        else:
+            self.done.emit(request, result, None)
+
+
+class QueryExecutor(QtCore.QObject):
+    """Thread pool which delivers results through Qt signals
+
+    Args:
+        max_threads(int): maximum amount of concurrently running requests
+        parent(QtCore.QObject, optional): parent of the executor
+
+    """
+
+    # Emitted from the pool threads, received in the executor's thread
+    _done = QtCore.Signal(object, object, object)
+
+    def __init__(self, max_threads=4, parent=None):
+        QtCore.QObject.__init__(self, parent)
+
+        pool = QtCore.QThreadPool(self)
+        pool.setMaxThreadCount(max_threads)
+
+        self._pool = pool
+        self._pending = {}
+        self._latest = {}
+
+        self._done.connect(self._on_done)
+
+    def submit(self, func, args=(), kwargs=None, callback=None, error=None,
+               key=None):
+        """Run a function in the thread pool
+
+        Args:
+            func(callable): function to run
+            args(tuple): positional arguments for the function
+            kwargs(dict): keyword arguments for the function
+            callback(callable, optional): called with the result
+            error(callable, optional): called with the raised exception, the
+                exception is logged when no error callback is given
+            key(str, optional): cancel earlier requests with the same key
+
+        Returns:
+            Request
+
+        """
+
+        request = Request(func, tuple(args), dict(kwargs or {}),
+                          callback, error, key)
+
+        if key is not None:
+            self.cancel(key)
+            self._latest[key] = request
+
+        self._pending[request.id] = request
+        self._pool.start(_Runnable(request, self._done))
+
+        return request
+
+    def cancel(self, key):
+        """Cancel the last request submitted with the given key"""
+        request = self._latest.pop(key, None)
+        if request is not None:
+            request.cancel()
+
+    def is_busy(self, key=None):
+        if key is None:
+            return bool(self._pending)
+        return key in self._latest
+
+    def wait(self, msecs=-1):
+        """Block until all running requests are done, mainly for scripts"""
+        return self._pool.waitForDone(msecs)
+
+    def _on_done(self, request, result, exception):
+        self._pending.pop(request.id, None)
+        if request.key is not None and \
+                self._latest.get(request.key) is request:
+            self._latest.pop(request.key)
+
+        if request.cancelled:
+            return
+
+        if exception is not None:
+            if request.error is not None:
+                request.error(exception)
+            else:
+                name = getattr(request.func, "__name__", repr(request.func))
+                log.error("Error in %s: %s" % (name, exception))
+            return
+
+        if request.callback is not None:
+            request.callback(result)
+
+
+def get_executor():
+    """Return the executor shared by the widgets of the application"""
+
+    if self._executor is None:
+        self._executor = QueryExecutor()
+
+    return self._executor
@@ -0,0 +1,91 @@
+"""Fixtures of the tests
+
+The Qt tests run on the offscreen platform, the database is an in memory
+mongomock client.
+
+    $ python -m pytest tests
+
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from avalon.vendor.Qt import QtWidgets
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    yield app
+
+
+@pytest.fixture
+def slot_errors(monkeypatch):
+    """Exceptions raised in slots, Qt hands them to sys.excepthook"""
+
+    errors = []
+    monkeypatch.setattr(sys, "excepthook",
+                        lambda *exc_info: errors.append(exc_info))
+    return errors
+
+
+@pytest.fixture
+def wait(qapp):
+    """Process events until a condition is met or the timeout is reached"""
+
+    def wait(condition, timeout=5.0):
+        end = time.time() + timeout
+        while not condition():
+            if time.time() > end:
+                return False
+            qapp.processEvents()
+            time.sleep(0.001)
+        return True
+
+    return wait
+
+
+@pytest.fixture
+def database():
+    """Install lib on an empty in memory database"""
+
+    mongomock = pytest.importorskip("mongomock")
+
+    from cbprojectmanager import lib, connection
+
+    lib.uninstall()
+    connection.disconnect("test")
+    lib.install("test", database="test", client=mongomock.MongoClient())
+
+    yield lib._database
+
+    lib.uninstall()
+    connection.disconnect("test")
+
+
+@pytest.fixture
+def projects(database):
+    """Add a few projects with assets to the database"""
+
+    names = ["alpha", "beta", "gamma"]
+    for name in names:
+        collection = database[name]
+        _id = collection.insert_one({"schema": "avalon-core:project-2.0",
+                                     "type": "project",
+                                     "name": name,
+                                     "data": {"fps": 25},
+                                     "config": {"tasks": [], "apps": []}})
+        collection.insert_many([{"schema": "avalon-core:asset-2.0",
+                                 "type": "asset",
+                                 "name": "asset%i" % index,
+                                 "silo": "assets",
+                                 "parent": _id.inserted_id,
+                                 "data": {}}
+                                for index in range(10)])
+
+    return names
@@ -0,0 +1,85 @@
+"""Projects are exported to archives and restored in one piece"""
+
+import json
+import zipfile
+
+import pytest
+
+
+@pytest.fixture
+def exported(projects, tmpdir):
+    from cbprojectmanager import archive
+
+    path = str(tmpdir.join("alpha.zip"))
+    manifest = archive.export_project("alpha", path,
+                                      batch_size=4,
+                                      max_workers=2)
+
+    return path, manifest
+
+
+def _rewrite_manifest(source, path, **changes):
+    """Copy an archive with changed manifest values"""
+
+    from cbprojectmanager import archive
+
+    with zipfile.ZipFile(source, "r") as original, \
+            zipfile.ZipFile(path, "w") as copy:
+        manifest = json.loads(original.read(archive.MANIFEST).decode("utf-8"))
+        manifest.update(changes)
+        copy.writestr(archive.MANIFEST, json.dumps(manifest))
+        copy.writestr(archive.DOCUMENTS, original.read(archive.DOCUMENTS))
+
+
+def test_export_import(exported, database):
+    from cbprojectmanager import archive, lib
+
+    path, manifest = exported
+    assert manifest["documents"] == 11
+    assert manifest["batches"] == 3
+    assert archive.read_manifest(path)["project"] == "alpha"
+
+    report = archive.import_project(path, name="restored", batch_size=4)
+    assert report["documents"] == 11
+
+    # The documents keep their ids
+    source = {d["_id"]: d for d in database["alpha"].find()}
+    restored = {d["_id"]: d for d in database["restored"].find()}
+    assert set(restored) == set(source)
+
+    project = lib.get_project("restored")
+    assert project["_id"] == lib.get_project("alpha")["_id"]
+    assert restored[project["_id"]]["name"] == "restored"
+
+
+def test_import_corrupt_archive(exported, database, tmpdir):
+    from cbprojectmanager import archive, lib
+
+    path = str(tmpdir.join("corrupt.zip"))
+    _rewrite_manifest(exported[0], path, sha256="0" * 64)
+
+    with pytest.raises(archive.ArchiveError):
+        archive.import_project(path, name="restored", batch_size=4)
+
+    # Nothing of the project is left behind
+    assert sorted(database.collection_names()) == ["alpha", "beta", "gamma"]
+    assert lib.get_project("restored") is None
+
+
+def test_import_errors(exported, tmpdir):
+    from cbprojectmanager import archive
+
+    path, _ = exported
+
+    with pytest.raises(RuntimeError):
+        archive.import_project(path)
+
+    other = tmpdir.join("other.zip")
+    other.write("not an archive")
+    with pytest.raises(archive.ArchiveError):
+        archive.import_project(str(other), name="restored")
+
+    newer = str(tmpdir.join("newer.zip"))
+    _rewrite_manifest(path, newer, format=archive.FORMAT_VERSION + 1)
+    with pytest.raises(archive.ArchiveError):
+        archive.import_project(newer, name="restored")
@@ -0,0 +1,34 @@
+"""The data access benchmark only seeds and drops empty databases"""
+
+import pytest
+
+
+def test_refuse_database_in_use(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+
+    from cbprojectmanager import benchmark
+
+    client = mongomock.MongoClient()
+    client["avalon"]["MyProject"].insert_one({"type": "project",
+                                              "name": "MyProject"})
+
+    monkeypatch.setattr(mongomock, "MongoClient", lambda: client)
+
+    with pytest.raises(RuntimeError):
+        benchmark.measure_lib(database="avalon", mock=True,
+                              projects=[1], assets=[1], repeat=1)
+
+    assert client["avalon"].collection_names() == ["MyProject"]
+    assert client["avalon"]["MyProject"].count_documents({}) == 1
+
+
+def test_measure_lib():
+    pytest.importorskip("mongomock")
+
+    from cbprojectmanager import benchmark
+
+    result = benchmark.measure_lib(mock=True, projects=[2], assets=[10],
+                                   repeat=1)
+
+    assert set(result["projects"]["2"]) >= {"get_project", "create_project"}
+    assert result["assets"]["10"]["clone_project"]["rate"]["min"] > 0
@@ -0,0 +1,31 @@
+"""Errors of the command line interface are reported without a traceback"""
+
+import json
+
+import pytest
+
+
+@pytest.mark.parametrize("argv", [
+    ["clone", "missing", "copy"],
+    ["stats", "missing"],
+    ["export", "missing"],
+    ["import-assets", "missing", "assets.csv"],
+])
+def test_unknown_project(projects, capsys, argv):
+    from cbprojectmanager.__main__ import main
+
+    assert main(argv) == 1
+
+    output = capsys.readouterr()
+    assert "missing" in output.err
+    assert "Traceback" not in output.err
+
+
+def test_error_as_json(projects, capsys):
+    from cbprojectmanager.__main__ import main
+
+    assert main(["clone", "alpha", "beta", "--json"]) == 1
+
+    output = capsys.readouterr()
+    assert json.loads(output.out) == {
+        "error": "Collection with name `beta` already exists"}
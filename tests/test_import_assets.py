@@ -0,0 +1,68 @@
+"""Imported rows become assets, invalid rows are skipped and reported"""
+
+
+def _import(tmpdir, name, text):
+    from cbprojectmanager import lib
+
+    path = tmpdir.join(name)
+    path.write(text)
+
+    return lib.import_assets("alpha", str(path))
+
+
+def test_import_csv(projects, database, tmpdir):
+    report = _import(tmpdir, "assets.csv", "\n".join([
+        "name,silo,data.label",
+        "hero,characters,Hero",
+        ",assets,",
+        "foo,,",
+        "not valid,props,",
+    ]))
+
+    assert report["read"] == 4
+    assert report["inserted"] == 1
+    assert report["invalid"] == 3
+    assert report["errors"][0] == "line 3: Row has no `name`"
+    assert report["errors"][1] == "line 4: Row has no `silo`"
+
+    hero = database["alpha"].find_one({"name": "hero"})
+    assert hero["silo"] == "characters"
+    assert hero["data"] == {"label": "Hero"}
+
+    names = database["alpha"].distinct("name", {"type": "asset"})
+    assert "" not in names
+    assert "foo" not in names
+
+
+def test_import_json_lines(projects, database, tmpdir):
+    report = _import(tmpdir, "assets.jsonl", "\n".join([
+        '{"name": "hero", "silo": "characters", "data": {"label": "Hero"}}',
+        '{"name": "villain"}',
+        '{"name": "broken", ',
+        '["name", "silo"]',
+    ]))
+
+    assert report["read"] == 4
+    assert report["inserted"] == 1
+    assert report["invalid"] == 3
+    assert report["errors"][0] == "line 2: Row has no `silo`"
+
+    assert database["alpha"].find_one({"name": "villain"}) is None
+
+
+def test_import_failed_inserts(projects, database, tmpdir):
+    database["alpha"].create_index("name", unique=True)
+
+    report = _import(tmpdir, "assets.csv", "\n".join([
+        "name,silo",
+        "hero,characters",
+        "asset0,assets",
+        "villain,characters",
+    ]))
+
+    # The other rows of the chunk are inserted regardless
+    assert report["inserted"] == 2
+    assert report["failed"] == 1
+    assert report["errors"][0].startswith("line 3: ")
+
+    assert database["alpha"].count_documents({"name": "asset0"}) == 1
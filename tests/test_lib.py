@@ -0,0 +1,338 @@
+"""Data access functions of lib on an in memory database"""
+
+import bson
+import pymongo
+import pytest
+
+
+def _failing(code):
+    """Return a function which fails like an aggregation on the server"""
+
+    def fail(*args, **kwargs):
+        raise pymongo.errors.OperationFailure("Aggregation failed", code=code)
+
+    return fail
+
+
+def _page_names(project, **kwargs):
+    """Return the names of all assets read page by page"""
+
+    from cbprojectmanager import lib
+
+    names = []
+    token = None
+    while True:
+        documents, token = lib.get_asset_page(project,
+                                              resume_token=token,
+                                              **kwargs)
+        names.extend(document["name"] for document in documents)
+        if token is None:
+            return names
+
+
+# Batched project queries
+
+def test_union_fallback(projects, monkeypatch):
+    from cbprojectmanager import lib
+
+    monkeypatch.setattr(lib, "_aggregate_projects",
+                        _failing(lib._UNRECOGNIZED_STAGE))
+
+    assert sorted(p["name"] for p in lib.get_projects()) == projects
+    assert not lib._supports_union
+
+
+def test_union_error_is_raised(projects, monkeypatch):
+    from cbprojectmanager import lib
+
+    # Unauthorized, the server does support the stage
+    monkeypatch.setattr(lib, "_aggregate_projects", _failing(13))
+
+    with pytest.raises(pymongo.errors.OperationFailure):
+        list(lib.get_projects())
+
+    assert lib._supports_union
+
+
+def test_union_batches(projects, monkeypatch):
+    from cbprojectmanager import lib
+
+    batches = []
+
+    def aggregate(names, projection=None):
+        batches.append(names)
+        return [(name, lib._database[name].find_one({"type": "project"},
+                                                    projection))
+                for name in names]
+
+    monkeypatch.setattr(lib, "_aggregate_projects", aggregate)
+
+    result = list(lib.iter_projects(projection=["name"], batch_size=2))
+
+    assert [name for name, _ in result] == projects
+    assert batches == [["alpha", "beta"], ["gamma"]]
+    assert lib._supports_union
+
+
+# Project statistics
+
+EXPECTED_STATISTICS = {"documents": {"project": 1, "asset": 10},
+                       "silos": {"assets": 10},
+                       "tasks": {},
+                       "assets": 10,
+                       "assets_without_tasks": 10,
+                       "max_tasks": 0}
+
+
+@pytest.fixture
+def facet_failure(monkeypatch):
+    """Fail aggregations with a `$facet` stage with the given error code"""
+
+    mongomock = pytest.importorskip("mongomock")
+
+    aggregate = mongomock.collection.Collection.aggregate
+
+    def patch(code):
+        def without_facet(collection, pipeline, *args, **kwargs):
+            if "$facet" in pipeline[0]:
+                _failing(code)()
+            return aggregate(collection, pipeline, *args, **kwargs)
+
+        monkeypatch.setattr(mongomock.collection.Collection, "aggregate",
+                            without_facet)
+
+    return patch
+
+
+def test_statistics(projects):
+    from cbprojectmanager import lib
+
+    assert lib.get_project_statistics("alpha") == EXPECTED_STATISTICS
+    assert lib._supports_facet
+
+
+def test_facet_fallback(projects, facet_failure):
+    from cbprojectmanager import lib
+
+    facet_failure(lib._UNRECOGNIZED_STAGE)
+
+    assert lib.get_project_statistics("alpha") == EXPECTED_STATISTICS
+    assert not lib._supports_facet
+
+
+def test_facet_error_is_raised(projects, facet_failure):
+    from cbprojectmanager import lib
+
+    facet_failure(13)
+
+    with pytest.raises(pymongo.errors.OperationFailure):
+        lib.get_project_statistics("alpha")
+
+    assert lib._supports_facet
+
+
+# Project index and cache
+
+def test_project_index(projects, database):
+    from cbprojectmanager import lib
+
+    database["storage"].insert_one({"type": "project", "name": "stored"})
+    lib.invalidate_cache()
+
+    assert lib.get_project("beta")["name"] == "beta"
+    assert lib.get_project("stored")["name"] == "stored"
+    assert lib.get_project("missing") is None
+
+    # Created and dropped projects update the index, it is not rebuilt
+    index = lib._get_project_index()
+    assert lib.create_project("delta")
+    assert lib._get_project_index() is index
+    assert index["delta"] == "delta"
+
+    lib.drop_collection("delta")
+    assert lib._get_project_index() is index
+    assert "delta" not in index
+    assert lib.get_project("delta") is None
+
+
+def test_ambiguous_project_name(projects, database):
+    from cbprojectmanager import lib
+
+    database["other"].insert_one({"type": "project", "name": "alpha"})
+    lib.invalidate_cache()
+
+    assert lib._get_project_index()["alpha"] is None
+    assert lib.get_project("alpha") is None
+
+
+def test_cached_documents_are_copies(projects):
+    from cbprojectmanager import lib
+
+    document = lib.get_project("alpha")
+    document["data"]["fps"] = 50
+
+    assert lib.get_project("alpha")["data"]["fps"] == 25
+
+
+def test_cache_invalidation(projects, database):
+    from cbprojectmanager import lib
+
+    assert lib.get_project("alpha")["data"]["fps"] == 25
+
+    database["alpha"].update_one({"type": "project"},
+                                 {"$set": {"data.fps": 50}})
+    assert lib.get_project("alpha")["data"]["fps"] == 25
+
+    invalidated = []
+    lib.register_invalidate_callback(invalidated.append)
+    try:
+        lib.invalidate_cache("alpha")
+    finally:
+        lib.deregister_invalidate_callback(invalidated.append)
+
+    assert invalidated == ["alpha"]
+    assert lib.get_project("alpha")["data"]["fps"] == 50
+
+
+def test_collection_names(projects, database):
+    from cbprojectmanager import lib
+
+    assert lib.get_collection_names() == projects
+
+    # Cached until a collection is created through lib
+    database.create_collection("outside")
+    assert "outside" not in lib.get_collection_names()
+
+    lib.create_collection("delta")
+    assert "outside" in lib.get_collection_names()
+    assert "delta" in lib.get_collection_names()
+
+    with pytest.raises(RuntimeError):
+        lib.create_collection("delta")
+
+
+# Assets
+
+def test_asset_pages(projects):
+    names = ["asset%i" % index for index in range(10)]
+
+    assert _page_names("alpha", page_size=3) == names
+    assert _page_names("alpha", page_size=3,
+                       direction=pymongo.DESCENDING) == names[::-1]
+    assert _page_names("alpha", page_size=3, sort_key="_id") == names
+    assert _page_names("alpha", page_size=10) == names
+
+
+def test_asset_pages_with_equal_keys(projects):
+    # All assets share the silo, the id decides the order
+    names = _page_names("alpha", page_size=3, sort_key="silo")
+
+    assert sorted(names) == ["asset%i" % index for index in range(10)]
+
+
+def test_asset_pages_are_stable(projects, database):
+    from cbprojectmanager import lib
+
+    documents, token = lib.get_asset_page("alpha", page_size=3)
+    names = [document["name"] for document in documents]
+
+    # Added before the current page, it is not returned nor are others
+    # returned twice
+    database["alpha"].insert_one({"type": "asset",
+                                  "name": "asset00",
+                                  "silo": "assets"})
+
+    while token is not None:
+        documents, token = lib.get_asset_page("alpha", page_size=3,
+                                              resume_token=token)
+        names.extend(document["name"] for document in documents)
+
+    assert names == ["asset%i" % index for index in range(10)]
+
+
+def test_assets_of_silo(projects, database):
+    from cbprojectmanager import lib
+
+    assert len(lib.get_assets("alpha", silo="assets")) == 10
+
+    with pytest.raises(ValueError):
+        lib.get_assets("alpha", silo="props")
+
+    # Silos added since the silos were cached are found
+    database["alpha"].insert_one({"type": "asset",
+                                  "name": "chair",
+                                  "silo": "props"})
+    assert [a["name"] for a in lib.get_assets("alpha", silo="props")] == \
+        ["chair"]
+
+
+# Cloning
+
+def test_clone_project(projects, database):
+    from cbprojectmanager import lib
+
+    source = database["alpha"]
+    parent = source.find_one({"name": "asset0"})
+    source.update_one({"name": "asset1"},
+                      {"$set": {"data.visualParent": parent["_id"]}})
+
+    report = lib.clone_project("alpha", "alpha_copy", batch_size=4)
+    assert report["documents"] == 11
+
+    clone = database["alpha_copy"]
+    project = clone.find_one({"type": "project"})
+    assert project["name"] == "alpha_copy"
+    assert lib.get_project("alpha_copy")["_id"] == project["_id"]
+
+    # New ids with the references remapped
+    assert not set(source.distinct("_id")) & set(clone.distinct("_id"))
+
+    assets = {a["name"]: a for a in clone.find({"type": "asset"})}
+    assert len(assets) == 10
+    assert all(a["parent"] == project["_id"] for a in assets.values())
+    assert assets["asset1"]["data"]["visualParent"] == assets["asset0"]["_id"]
+
+
+def test_clone_project_failure(projects, database, monkeypatch):
+    from cbprojectmanager import lib
+
+    def fail(collection):
+        raise RuntimeError("Could not create the indexes")
+
+    monkeypatch.setattr(lib, "ensure_indexes", fail)
+
+    with pytest.raises(RuntimeError):
+        lib.clone_project("alpha", "alpha_copy", batch_size=4)
+
+    # The temporary collection is dropped
+    assert sorted(database.collection_names()) == projects
+    assert lib.get_project("alpha_copy") is None
+
+
+def test_clone_project_errors(projects):
+    from cbprojectmanager import lib
+
+    with pytest.raises(ValueError):
+        lib.clone_project("missing", "copy")
+
+    with pytest.raises(RuntimeError):
+        lib.clone_project("alpha", "beta")
+
+
+# Raw batches
+
+def test_raw_batches(projects, database):
+    from cbprojectmanager import lib
+
+    batches = list(lib.iter_raw_batches("alpha", batch_size=4))
+    assert len(batches) == 3
+
+    documents = [d for data in batches for d in bson.decode_all(data)]
+    assert documents == list(database["alpha"].find())
+
+    batches = list(lib.iter_raw_batches("alpha", query={"type": "project"}))
+    assert [d["name"] for d in bson.decode_all(b"".join(batches))] == \
+        ["alpha"]
+
+    with pytest.raises(RuntimeError):
+        list(lib.iter_raw_batches("missing"))
@@ -0,0 +1,59 @@
+"""Switching projects does not grow the overview"""
+
+import tracemalloc
+
+# Amount of project switches
+SWITCHES = 10000
+
+# Allowed growth of the Python allocations in bytes over all switches
+MAX_GROWTH = 256 * 1024
+
+
+def _project_data(index):
+    """Overview data of a project, the projects differ in their silos"""
+
+    silos = {"silo%i" % silo: index for silo in range(index % 4)}
+    silos["total"] = index
+
+    return {"general": {"name": "project%i" % index,
+                        "fps": 25,
+                        "resolution": "1920x1080"},
+            "assets": silos,
+            "activity": {"Last modified": "2018-01-%02i" % (index % 28 + 1)}}
+
+
+def test_switch_projects_memory(qapp):
+    from avalon.vendor.Qt import QtWidgets, QtCore
+    from cbprojectmanager.widgets import OverviewWidget
+
+    overview = OverviewWidget()
+    overview.show()
+
+    def switch(index):
+        overview.set_data(_project_data(index))
+        if index % 100 == 0:
+            qapp.processEvents()
+            QtCore.QCoreApplication.sendPostedEvents(
+                None, QtCore.QEvent.DeferredDelete)
+
+    # Create the tiles and let Qt settle its caches
+    for index in range(100):
+        switch(index)
+    switch(0)
+
+    widgets = len(QtWidgets.QApplication.allWidgets())
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for index in range(SWITCHES):
+            switch(index)
+        switch(0)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    assert len(QtWidgets.QApplication.allWidgets()) == widgets
+    assert after - before < MAX_GROWTH
+
+    overview.close()
@@ -0,0 +1,39 @@
+"""The timed slots of the profiler accept the arguments of their signals"""
+
+import pytest
+
+
+@pytest.fixture
+def profiler(qapp):
+    from cbprojectmanager import profiler
+
+    yield profiler.enable()
+
+    profiler.disable()
+
+
+def test_timed_slots_with_signal_arguments(projects, profiler, wait,
+                                           slot_errors):
+    from cbprojectmanager import app
+    from cbprojectmanager.worker import get_executor
+
+    window = app.Window()
+    window.show()
+
+    combobox = window._projects
+    assert wait(lambda: combobox.count() == 4)
+
+    # currentIndexChanged(int) and clicked(bool) pass an argument the slots
+    # do not take
+    combobox.setCurrentIndex(combobox.findText("beta"))
+    assert wait(lambda: not get_executor().is_busy())
+
+    window._create_button.click()
+
+    assert not slot_errors
+
+    slots = profiler.summary()["slots"]
+    assert slots["Window.on_project_index_changed"]["calls"] >= 1
+    assert slots["Window.on_create"]["calls"] == 1
+
+    window.close()
@@ -0,0 +1,98 @@
+"""The window stays responsive while the database is slow"""
+
+import time
+import functools
+
+import pytest
+
+# Seconds added to every patched lib call
+LATENCY = 0.3
+
+# Longest allowed gap in seconds between two heartbeats of the event loop
+MAX_STALL = 0.1
+
+SLOW_FUNCTIONS = ["install",
+                  "get_projects",
+                  "get_project",
+                  "get_project_statistics",
+                  "get_last_modified"]
+
+
+@pytest.fixture
+def slow_lib(monkeypatch, projects):
+    """Add LATENCY to the database calls of lib"""
+
+    from cbprojectmanager import lib
+
+    def delayed(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            time.sleep(LATENCY)
+            return func(*args, **kwargs)
+        return wrapper
+
+    for name in SLOW_FUNCTIONS:
+        monkeypatch.setattr(lib, name, delayed(getattr(lib, name)))
+
+    return lib
+
+
+@pytest.fixture
+def heartbeat(qapp):
+    """Times at which a 10 ms timer fired"""
+
+    from avalon.vendor.Qt import QtCore
+
+    beats = []
+    timer = QtCore.QTimer()
+    timer.setInterval(10)
+    timer.timeout.connect(lambda: beats.append(time.time()))
+    timer.start()
+
+    yield beats
+
+    timer.stop()
+
+
+def _longest_gap(beats):
+    return max(b - a for a, b in zip(beats, beats[1:]))
+
+
+def test_executor_callback_with_latency(slow_lib, heartbeat, wait):
+    from cbprojectmanager.worker import QueryExecutor
+
+    executor = QueryExecutor()
+
+    results = []
+    executor.submit(slow_lib.get_project, args=("alpha",),
+                    callback=results.append)
+
+    assert wait(lambda: results)
+    assert results[0]["name"] == "alpha"
+
+    assert len(heartbeat) > 10
+    assert _longest_gap(heartbeat) < MAX_STALL
+
+
+def test_window_with_latency(slow_lib, heartbeat, wait, slot_errors):
+    from cbprojectmanager import app
+    from cbprojectmanager.worker import get_executor
+
+    window = app.Window()
+    window.show()
+
+    projects = window._projects
+    assert wait(lambda: projects.count() == 4)
+
+    # Select a project, the overview is filled in the background
+    projects.setCurrentIndex(projects.findText("beta"))
+    assert wait(lambda: not get_executor().is_busy())
+
+    # Refresh through the button, the event loop keeps running
+    window._refresh_button.click()
+    assert wait(lambda: window._refresh_button.isEnabled())
+
+    assert _longest_gap(heartbeat) < MAX_STALL
+    assert not slot_errors
+
+    window.close()
@@ -0,0 +1,9 @@
+"""The window module imports without the database libraries"""
+
+
+def test_import_app_without_heavy_modules():
+    from cbprojectmanager import benchmark
+
+    result = benchmark.measure_import("cbprojectmanager.app", repeat=1)
+
+    assert result["heavy_modules"] == []
@@ -0,0 +1,69 @@
+"""Documents are validated with compiled and cached schema validators"""
+
+import multiprocessing
+from concurrent import futures
+
+import bson
+import pytest
+
+
+def _asset(name):
+    return {"schema": "avalon-core:asset-2.0",
+            "type": "asset",
+            "name": name,
+            "silo": "assets",
+            "parent": bson.ObjectId(),
+            "data": {}}
+
+
+def _compiled_in_worker(data):
+    """Return the compiled validators of a worker and validate a batch"""
+
+    from cbprojectmanager import lib, validation
+
+    validators = getattr(lib._validators, "cache", {})
+    compiled = sorted(name for name, validator in validators.items()
+                      if validator is not None)
+
+    return compiled, validation._validate_batch("project", data)
+
+
+def test_compiled_validator():
+    from avalon.schema import ValidationError
+    from cbprojectmanager import lib
+
+    validator = lib._get_validator("asset-2.0.json")
+    assert validator is not None
+    assert lib._get_validator("asset-2.0.json") is validator
+
+    lib.validate(_asset("asset_01"))
+    with pytest.raises(ValidationError):
+        lib.validate(_asset("not valid"))
+
+
+def test_unknown_schema():
+    from cbprojectmanager import lib
+
+    assert lib._get_validator("unknown-1.0.json") is None
+
+
+def test_worker_validators():
+    from cbprojectmanager import validation
+
+    data = b"".join(bson.BSON.encode(document) for document in
+                    [_asset("asset_01"), _asset("not valid")])
+
+    # Spawned, a forked worker would share the validators of this process
+    context = multiprocessing.get_context("spawn")
+    with futures.ProcessPoolExecutor(max_workers=1,
+                                     mp_context=context,
+                                     initializer=validation._initialize) \
+            as pool:
+        compiled, (count, failures) = pool.submit(_compiled_in_worker,
+                                                  data).result()
+
+    assert "project-2.0.json" in compiled
+    assert "asset-2.0.json" in compiled
+
+    assert count == 2
+    assert [failure["name"] for failure in failures] == ["not valid"]
@@ -0,0 +1,74 @@
+"""Project changes are found by polling when change streams are missing"""
+
+import time
+
+
+def _add_project(database, name):
+    database[name].insert_one({"schema": "avalon-core:project-2.0",
+                               "type": "project",
+                               "name": name,
+                               "data": {},
+                               "config": {"tasks": [], "apps": []}})
+
+
+def test_poll(projects, database):
+    from cbprojectmanager.watcher import ProjectWatcher
+
+    emitted = []
+    watcher = ProjectWatcher(lambda event, name, document:
+                             emitted.append((event, name)))
+
+    # The first poll finds all projects, without emitting them
+    events = watcher.poll(emit=False)
+    assert sorted(name for _, name, _ in events) == projects
+    assert not emitted
+
+    _add_project(database, "delta")
+    database["alpha"].update_one({"type": "project"},
+                                 {"$set": {"data.fps": 50}})
+    database["gamma"].update_one({"type": "project"},
+                                 {"$set": {"name": "omega"}})
+    database.drop_collection("beta")
+
+    events = sorted((event, name) for event, name, _ in watcher.poll())
+    assert events == [("added", "delta"),
+                      ("added", "omega"),
+                      ("removed", "beta"),
+                      ("removed", "gamma"),
+                      ("updated", "alpha")]
+    assert sorted(emitted) == events
+
+    # Nothing changed since
+    assert watcher.poll() == []
+
+
+def test_polling_fallback(projects, database):
+    from cbprojectmanager import lib
+    from cbprojectmanager.watcher import ProjectWatcher
+
+    emitted = []
+    watcher = ProjectWatcher(lambda event, name, document:
+                             emitted.append((event, name)),
+                             interval=0.05)
+
+    lib.get_project("alpha")
+
+    watcher.start()
+    try:
+        # Wait for the first snapshot of the projects
+        end = time.time() + 5
+        while len(watcher._projects) < 3 and time.time() < end:
+            time.sleep(0.01)
+
+        _add_project(database, "delta")
+
+        while not emitted and time.time() < end:
+            time.sleep(0.01)
+    finally:
+        watcher.stop(timeout=5)
+
+    assert not watcher.running
+    assert emitted == [("added", "delta")]
+
+    # The project index is rebuilt for added projects
+    assert lib.get_project("delta")["name"] == "delta"